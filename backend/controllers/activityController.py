@@ -0,0 +1,169 @@
+import os
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from database.database import run_db, FDActivityLog, IST
+from utils.team_directory import team_directory
+from utils.pagination import encode_cursor, decode_cursor
+
+
+ACTIVITY_PAGE_MAX = int(os.getenv("ACTIVITY_PAGE_MAX", "100"))
+
+# Message type -> LIKE pattern over the messages the controllers write.
+ACTIVITY_TYPES = {
+    "project_added": "Project '%' added",
+    "project_updated": "Project '%' updated",
+    "project_deleted": "Project '%' deleted",
+    "team_created": "Team '%' created",
+    "upload": "% projects added, % updated from '%'",
+}
+
+
+def _decode_activity_cursor(cursor: str):
+    timestamp, log_uuid = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(timestamp), log_uuid
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _activity_type(message: str):
+    if message.startswith("Project '"):
+        for suffix in ("added", "updated", "deleted"):
+            if message.endswith(f"' {suffix}"):
+                return f"project_{suffix}"
+    if message.startswith("Team '") and message.endswith("' created"):
+        return "team_created"
+    if " updated from '" in message:
+        return "upload"
+    return None
+
+
+def _query_activities(db, team_id=None, since=None, until=None, types=None, cursor=None, limit=10):
+    """Newest-first page of activity logs, keyset-paginated on (log_timestamp, log_uuid).
+
+    The team filter runs on idx_log_team_timestamp and the unfiltered admin
+    view on idx_log_timestamp; InnoDB secondary indexes carry the primary key,
+    so both also cover the log_uuid tie-breaker.
+    """
+    query = db.query(FDActivityLog.log_uuid, FDActivityLog.log_message, FDActivityLog.log_timestamp, FDActivityLog.team_id)
+    if team_id is not None:
+        query = query.filter(FDActivityLog.team_id == team_id)
+    if since is not None:
+        query = query.filter(FDActivityLog.log_timestamp >= since)
+    if until is not None:
+        query = query.filter(FDActivityLog.log_timestamp < until)
+    if types:
+        query = query.filter(or_(*(FDActivityLog.log_message.like(ACTIVITY_TYPES[t]) for t in types)))
+    if cursor is not None:
+        timestamp, log_uuid = cursor
+        query = query.filter(or_(
+            FDActivityLog.log_timestamp < timestamp,
+            and_(FDActivityLog.log_timestamp == timestamp, FDActivityLog.log_uuid < log_uuid),
+        ))
+    return (
+        query.order_by(FDActivityLog.log_timestamp.desc(), FDActivityLog.log_uuid.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def _user_team_id(db, user):
+    team = team_directory.resolve(db, user.get("team_name"))
+    return team.team_id if team else None
+
+
+async def fetch_recent_activity_logs(k: int, user, db: Session):
+    return await run_db(_recent_activity_logs, db, k, user)
+
+
+def _recent_activity_logs(db: Session, k: int, user):
+    try:
+        k = max(1, min(k, ACTIVITY_PAGE_MAX))
+        if user.get("flipdocs-admin"):
+            activities = _query_activities(db, limit=k)
+        else:
+            team_id = _user_team_id(db, user)
+            if not team_id:
+                return []
+            activities = _query_activities(db, team_id=team_id, limit=k)
+        return [
+                {
+                    "uuid": activity.log_uuid,
+                    "message": activity.log_message,
+                    "time":activity.log_timestamp
+                } for activity in activities
+            ]
+    except SQLAlchemyError as e:
+        db.rollback()
+        error_msg = str(e.__cause__) if e.__cause__ else str(e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {error_msg}"
+        )
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=500, detail="Something went wrong...")
+
+
+def _as_stored_time(value: datetime):
+    """log_timestamp holds naive IST wall-clock times; convert aware inputs before comparing."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(IST).replace(tzinfo=None)
+    return value
+
+
+async def fetch_activity_logs(user, db: Session, limit: int, cursor: str = None, team_name: str = None,
+                              since: datetime = None, until: datetime = None, types=None):
+    """One page of activity history plus the cursor for the next page.
+
+    Admins see every team unless team_name is given; other users only see
+    their own team.
+    """
+    types = [t for t in (types or []) if t]
+    unknown = [t for t in types if t not in ACTIVITY_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown activity type: {', '.join(unknown)}")
+    limit = max(1, min(limit, ACTIVITY_PAGE_MAX))
+    after = _decode_activity_cursor(cursor) if cursor else None
+    since, until = _as_stored_time(since), _as_stored_time(until)
+    return await run_db(_activity_page, db, user, limit, after, team_name, since, until, types)
+
+
+def _activity_page(db: Session, user, limit, after, team_name, since, until, types):
+    try:
+        if not user.get("flipdocs-admin"):
+            team_name = user.get("team_name")
+        team_id = None
+        if team_name:
+            team = team_directory.resolve(db, team_name)
+            if not team:
+                raise HTTPException(status_code=400, detail=f"Invalid team name {team_name}")
+            team_id = team.team_id
+
+        # One extra row tells us whether another page exists.
+        rows = _query_activities(db, team_id, since, until, types, after, limit + 1)
+        page = rows[:limit]
+        teams = {team_id: team_directory.by_id(db, team_id) for team_id in {row.team_id for row in page}}
+        last = page[-1] if page else None
+        return {
+            "items": [
+                {
+                    "uuid": row.log_uuid,
+                    "message": row.log_message,
+                    "time": row.log_timestamp,
+                    "type": _activity_type(row.log_message),
+                    "team_name": teams[row.team_id].team_name if teams[row.team_id] else None,
+                } for row in page
+            ],
+            "next_cursor": encode_cursor(last.log_timestamp.isoformat(), last.log_uuid) if len(rows) > limit else None,
+        }
+    except SQLAlchemyError as e:
+        db.rollback()
+        error_msg = str(e.__cause__) if e.__cause__ else str(e)
+        raise HTTPException(status_code=500, detail=f"Database error: {error_msg}")
@@ -1,14 +1,24 @@
-import requests
-from database.database import get_db, FDProjectRegistry, FDActivityLog, FDTeam, IST
+import asyncio
+import os
+from database.database import run_db, FDProjectRegistry, FDActivityLog, FDTeam, IST, ENV_COLUMNS
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import SQLAlchemyError
-import requests.exceptions
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
 from datetime import datetime
 import uuid
 import pandas as pd
-from io import BytesIO, StringIO
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from utils.spec_cache import spec_cache
+from utils.spec_snapshots import forget_project, delete_snapshots, schedule_blob_prune
+from utils.url_validation import check_spec_url, UNREACHABLE, NOT_JSON
+from utils.log_retention import enforce_log_limit
+from database.session_hooks import after_commit
+from utils.project_stats import project_stats, env_presence, ensure_stats_loaded
+from utils.team_directory import team_directory
+from utils.pagination import encode_cursor, decode_cursor
+from utils.project_search import project_search, ensure_search_loaded, SEARCH_FIELDS
+from utils.registry_versions import registry_versions
 
 
 INVALID_VALUES = {"", "None", "null", "NULL", "none", "N/A", "n/a", "NaN", None, float('nan')}
@@ -22,40 +32,53 @@ class ProjectCreate(BaseModel):
     team_name:str=None
 
 def ensure_scheme(url):
-    if not (url.startswith("http://") or url.startswith("https://")):
+    """url with http:// prepended when it has no http(s) scheme; only used to reach the URL, never stored."""
+    if not url.lower().startswith(("http://", "https://")):
         return "http://" + url
     return url
 
 
+async def validate_project_urls(urls):
+    """Check (label, url) pairs concurrently and raise for the first invalid one, in order."""
+    results = await asyncio.gather(*(check_spec_url(ensure_scheme(url)) for _, url in urls))
+    for (label, _), result in zip(urls, results):
+        if result == UNREACHABLE:
+            raise HTTPException(status_code=400, detail=f"Invalid {label}")
+        if result == NOT_JSON:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON response from {label}")
+
+
 async def create_new_project(body, user: dict, db: Session) -> dict:
     try:
         if not (getattr(body, 'prod_url', None) or getattr(body, 'pre_prod_url', None) or getattr(body, 'pg_url', None)):
             raise HTTPException(status_code=400, detail="At least one URL must be provided")
 
+        urls_to_check = []
         for key, label in [('prod_url','prod_url'), ('pre_prod_url','pre_prod_url'), ('pg_url','pg_url')]:
             url = getattr(body, key, None)
             url = str(url).strip() if url is not None else ""
-            print(url)
             if pd.isna(url) or str(url).strip() in INVALID_VALUES:
                 setattr(body, key, None)
-                print(f"{label} is considered empty")
             elif url:
-                try:
-                    safe_url = ensure_scheme(url)
-                    resp = requests.get(safe_url, verify=False)
-                    resp.raise_for_status()
-                    resp.json()
-                except requests.exceptions.RequestException:
-                    raise HTTPException(status_code=400, detail=f"Invalid {label}")
-                except ValueError:
-                    raise HTTPException(status_code=400, detail=f"Invalid JSON response from {label}")
+                # Stored stripped, the same as a bulk upload stores it.
+                setattr(body, key, url)
+                urls_to_check.append((label, url))
+        await validate_project_urls(urls_to_check)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=500, detail="Something went wrong...")
+    return await run_db(_insert_project, db, body, user)
+
 
+def _insert_project(db: Session, body, user: dict) -> dict:
+    try:
         if user.get('flipdocs-admin'):
             team_name =  body.team_name
         else:
             team_name = user.get('team_name')
 
-        team = db.query(FDTeam).filter(FDTeam.team_name == team_name).first()
+        team = team_directory.resolve(db, team_name)
         if not team:
             raise HTTPException(status_code=400, detail=f"Invalid team name {team_name}")
 
@@ -71,6 +94,8 @@ async def create_new_project(body, user: dict, db: Session) -> dict:
         )
         db.add(project)
         db.flush()
+        presence, team_id = env_presence(project), team.team_id
+        after_commit(db, lambda: project_stats.apply(team_id, None, presence))
 
         activity = FDActivityLog(
             log_uuid=str(uuid.uuid4()),
@@ -79,8 +104,7 @@ async def create_new_project(body, user: dict, db: Session) -> dict:
             team_id=team.team_id
         )
         db.add(activity)
-
-        return {
+        result = {
             "uuid": project.project_uuid,
             "projectname": project.project_name,
             "team_name": team.team_name,
@@ -88,6 +112,11 @@ async def create_new_project(body, user: dict, db: Session) -> dict:
             "pre_prod_url": project.pre_production_url,
             "pg_url": project.playground_url
         }
+        after_commit(db, lambda: project_search.upsert(result))
+        after_commit(db, lambda: registry_versions.bump(team_id))
+        db.commit()
+
+        return result
     except SQLAlchemyError as e:
         db.rollback()
         error_msg = str(e.__cause__) if e.__cause__ else str(e)
@@ -101,28 +130,117 @@ async def create_new_project(body, user: dict, db: Session) -> dict:
         raise HTTPException(status_code=500, detail="Something went wrong...")
 
 
-async def retrieve_team_projects(team_name,user):
+PROJECT_PAGE_MAX = int(os.getenv("PROJECT_PAGE_MAX", "200"))
+
+# API field -> registry column.
+PROJECT_FIELDS = {
+    "uuid": FDProjectRegistry.project_uuid,
+    "projectname": FDProjectRegistry.project_name,
+    **{field: getattr(FDProjectRegistry, column) for field, column in ENV_COLUMNS.items()},
+    "created_at": FDProjectRegistry.created_at,
+}
+DEFAULT_PROJECT_FIELDS = ["uuid", "projectname", "team_name", "prod_url", "pre_prod_url", "pg_url"]
+PROJECT_SORTS = {"name": FDProjectRegistry.project_name, "created": FDProjectRegistry.created_at}
+
+
+def _parse_project_fields(fields):
+    if not fields:
+        return DEFAULT_PROJECT_FIELDS
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in PROJECT_FIELDS and f != "team_name"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def _parse_env_filter(envs):
+    envs = [env for env in envs or [] if env]
+    unknown = [env for env in envs if env not in ENV_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown environments: {', '.join(unknown)}")
+    return envs
+
+
+async def retrieve_team_projects(team_name, user, db: Session, limit: int = None, cursor: str = None,
+                                 sort: str = None, q: str = None, has=None, missing=None, fields: str = None):
+    """List a team's projects.
+
+    Without limit the whole (filtered) list is returned as before; with limit
+    the result is {"items", "next_cursor"}, keyset-paginated on the sort key
+    and project_uuid.
+    """
+    descending = bool(sort) and sort.startswith("-")
+    sort_key = (sort or "name").lstrip("-")
+    if sort_key not in PROJECT_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort, use one of: {', '.join(PROJECT_SORTS)} (prefix '-' for descending)")
+    if limit is not None:
+        limit = max(1, min(limit, PROJECT_PAGE_MAX))
+    after = decode_cursor(cursor, 2) if cursor else None
+    if after is not None and sort_key == "created":
+        try:
+            after[0] = datetime.fromisoformat(after[0])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return await run_db(
+        _team_projects, db, team_name, user,
+        limit, after, sort_key if (sort or limit is not None) else None, descending, q,
+        _parse_env_filter(has), _parse_env_filter(missing), _parse_project_fields(fields),
+    )
+
+
+def _team_projects(db: Session, team_name, user, limit, after, sort_key, descending, q, has, missing, fields):
     try:
-        db = next(get_db())
         if not user.get("flipdocs-admin") or not team_name:
             team_name = user.get("team_name")
 
-        team = db.query(FDTeam).filter(FDTeam.team_name == team_name).first()
+        team = team_directory.resolve(db, team_name)
         
         if not team:
             raise HTTPException(status_code=400, detail="Invalid team name") 
-            
-        projects = db.query(FDProjectRegistry).filter(FDProjectRegistry.team_id == team.team_id).all()
-        return [
-        {
-            "uuid": p.project_uuid,
-            "projectname": p.project_name,
-            "team_name": team_name,
-            "prod_url": p.production_url,
-            "pre_prod_url": p.pre_production_url,
-            "pg_url": p.playground_url
-        } for p in projects
-    ]
+
+        # Sort and cursor keys are always loaded, even if not returned.
+        columns = {name: PROJECT_FIELDS[name] for name in fields if name in PROJECT_FIELDS}
+        columns.setdefault("uuid", FDProjectRegistry.project_uuid)
+        sort_column = PROJECT_SORTS.get(sort_key)
+        if sort_column is not None:
+            columns["_sort"] = sort_column
+        query = db.query(*(column.label(name) for name, column in columns.items()))
+        # (team_id, project_name) is the uq_team_project index, so team + name prefix + name order is one range scan.
+        query = query.filter(FDProjectRegistry.team_id == team.team_id)
+        if q:
+            escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(FDProjectRegistry.project_name.like(f"{escaped}%", escape="\\"))
+        for env in has:
+            query = query.filter(PROJECT_FIELDS[env].isnot(None), PROJECT_FIELDS[env] != "")
+        for env in missing:
+            query = query.filter(or_(PROJECT_FIELDS[env].is_(None), PROJECT_FIELDS[env] == ""))
+        if after is not None:
+            value, last_uuid = after
+            if descending:
+                query = query.filter(or_(sort_column < value, and_(sort_column == value, FDProjectRegistry.project_uuid < last_uuid)))
+            else:
+                query = query.filter(or_(sort_column > value, and_(sort_column == value, FDProjectRegistry.project_uuid > last_uuid)))
+        if sort_column is not None:
+            order = [sort_column.desc(), FDProjectRegistry.project_uuid.desc()] if descending else [sort_column, FDProjectRegistry.project_uuid]
+            query = query.order_by(*order)
+        if limit is not None:
+            query = query.limit(limit + 1)
+
+        rows = query.all()
+        page = rows[:limit] if limit is not None else rows
+        items = [
+            {name: team_name if name == "team_name" else getattr(row, name) for name in fields}
+            for row in page
+        ]
+        if limit is None:
+            return items
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            sort_value = last._sort.isoformat() if sort_key == "created" else last._sort
+            next_cursor = encode_cursor(sort_value, last.uuid)
+        return {"items": items, "next_cursor": next_cursor}
     except SQLAlchemyError as e:
         error_msg = str(e.__cause__) if e.__cause__ else str(e)
         raise HTTPException(
@@ -137,7 +255,7 @@ async def retrieve_team_projects(team_name,user):
     
 
 
-async def update_existing_project(project_uuid: str, body,user):
+async def update_existing_project(project_uuid: str, body, user, db: Session):
     prod_url = body.prod_url if body.prod_url and body.prod_url.strip() else None
     pre_prod_url = body.pre_prod_url if body.pre_prod_url and body.pre_prod_url.strip() else None
     pg_url = body.pg_url if body.pg_url and body.pg_url.strip() else None
@@ -149,47 +267,26 @@ async def update_existing_project(project_uuid: str, body,user):
     body.pre_prod_url = pre_prod_url
     body.pg_url = pg_url
     
-    if prod_url:
-        try:
-            safe_url = ensure_scheme(prod_url)
-            response = requests.get(safe_url, verify=False)
-            response.raise_for_status()
-            response.json()
-        except requests.exceptions.RequestException as exc:
-            raise HTTPException(status_code=400, detail=f"Invalid prod url")
-        except ValueError as exc:
-            raise HTTPException(status_code=400, detail="Invalid JSON response from prod url")
-
-    if pre_prod_url:
-        try:
-            safe_url = ensure_scheme(pre_prod_url)
-            r_pre = requests.get(safe_url, verify=False)
-            r_pre.raise_for_status()
-            r_pre.json()
-        except requests.exceptions.RequestException as exc:
-            raise HTTPException(status_code=400, detail=f"Invalid pre_prod_url")
-        except ValueError as exc:
-            raise HTTPException(status_code=400, detail="Invalid JSON response from pre_prod_url")
-
-    if pg_url:
-        try:
-            safe_url = ensure_scheme(pg_url)
-            r_pg = requests.get(safe_url, verify=False)
-            r_pg.raise_for_status()
-            r_pg.json()
-        except requests.exceptions.RequestException as exc:
-            raise HTTPException(status_code=400, detail=f"Invalid pg_url")
-        except ValueError as exc:
-            raise HTTPException(status_code=400, detail="Invalid JSON response from pg_url")
+    await validate_project_urls([
+        (label, url) for label, url in [("prod url", prod_url), ("pre_prod_url", pre_prod_url), ("pg_url", pg_url)] if url
+    ])
 
-    try:
-        db = next(get_db())
+    result, changed_envs, orphans = await run_db(_update_project, db, project_uuid, body, user)
+    if changed_envs:
+        spec_cache.invalidate_project(project_uuid, changed_envs)
+        forget_project(project_uuid, changed_envs)
+        schedule_blob_prune(orphans)
+    return result
 
+
+def _update_project(db: Session, project_uuid: str, body, user):
+    prod_url, pre_prod_url, pg_url = body.prod_url, body.pre_prod_url, body.pg_url
+    try:
         team_name=body.team_name
         if not user.get("flipdocs-admin"):
             team_name = user.get("team_name")
 
-        team = db.query(FDTeam).filter(FDTeam.team_name == team_name).first()
+        team = team_directory.resolve(db, team_name)
         if not team:
             raise HTTPException(status_code=400, detail="Invalid team name")
         existing_project = db.query(FDProjectRegistry).filter(FDProjectRegistry.project_uuid == project_uuid,FDProjectRegistry.team_id == team.team_id).first()
@@ -197,6 +294,17 @@ async def update_existing_project(project_uuid: str, body,user):
         if not existing_project:
             raise HTTPException(status_code=404, detail="Project not found")
               
+        changed_envs = [
+            env for env, old_url, new_url in [
+                ("prod_url", existing_project.production_url, prod_url),
+                ("pre_prod_url", existing_project.pre_production_url, pre_prod_url),
+                ("pg_url", existing_project.playground_url, pg_url),
+            ] if old_url != new_url
+        ]
+
+        old_presence, old_team_id = env_presence(existing_project), existing_project.team_id
+        orphans = delete_snapshots(db, project_uuid, changed_envs) if changed_envs else set()
+
         existing_project.project_name = body.projectname
         existing_project.team_id = team.team_id
         existing_project.production_url = prod_url
@@ -212,8 +320,9 @@ async def update_existing_project(project_uuid: str, body,user):
             team_id=team.team_id
         )
         db.add(activity)
-        db.commit()
-        return {
+        new_presence, team_id = env_presence(existing_project), team.team_id
+        after_commit(db, lambda: project_stats.apply(team_id, old_presence, new_presence))
+        result = {
             "uuid": existing_project.project_uuid,
             "projectname": existing_project.project_name,
             "team_name": team.team_name,
@@ -221,6 +330,10 @@ async def update_existing_project(project_uuid: str, body,user):
             "pre_prod_url": existing_project.pre_production_url,
             "pg_url": existing_project.playground_url
         }
+        after_commit(db, lambda: project_search.upsert(result))
+        after_commit(db, lambda: registry_versions.bump(old_team_id, team_id))
+        db.commit()
+        return result, changed_envs, orphans
     except SQLAlchemyError as e:
         db.rollback()
         error_msg = str(e.__cause__) if e.__cause__ else str(e)
@@ -236,15 +349,22 @@ async def update_existing_project(project_uuid: str, body,user):
     
 
 
-async def delete_existing_project(project_uuid: str,user):
+async def delete_existing_project(project_uuid: str, user, db: Session):
+    result, orphans = await run_db(_delete_project, db, project_uuid, user)
+    spec_cache.invalidate_project(project_uuid)
+    forget_project(project_uuid)
+    schedule_blob_prune(orphans)
+    return result
+
+
+def _delete_project(db: Session, project_uuid: str, user):
     try:
-        db = next(get_db())
         project = db.query(FDProjectRegistry).filter(FDProjectRegistry.project_uuid == project_uuid).first()
 
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        team = db.query(FDTeam).filter(FDTeam.team_name == user.get("team_name")).first()
+        team = team_directory.resolve(db, user.get("team_name"))
         if not team:
             raise HTTPException(status_code=400, detail="Invalid team name")
         
@@ -254,7 +374,14 @@ async def delete_existing_project(project_uuid: str,user):
             
         project_name = project.project_name
         project_uuid = project.project_uuid
+        presence, project_team_id = env_presence(project), project.team_id
+        after_commit(db, lambda: project_stats.apply(project_team_id, presence, None))
+        after_commit(db, lambda: project_search.remove(project_uuid))
+        log_team_id = team.team_id
+        after_commit(db, lambda: registry_versions.bump(project_team_id, log_team_id))
         
+        # Not left to the FK cascade, which SQLite only applies with foreign keys enabled.
+        orphans = delete_snapshots(db, project_uuid)
         db.delete(project)
         enforce_log_limit(db, team.team_id)
         
@@ -266,7 +393,7 @@ async def delete_existing_project(project_uuid: str,user):
         )
         db.add(activity)
         db.commit()
-        return {"message": "Project deleted successfully"}
+        return {"message": "Project deleted successfully"}, orphans
         
     except SQLAlchemyError as e:
         db.rollback()
@@ -283,73 +410,38 @@ async def delete_existing_project(project_uuid: str,user):
     
 
 
-async def fetch_recent_activity_logs(k: int, user):
-    try:
-        db = next(get_db())
-        if user.get("flipdocs-admin"):
-            activities = db.query(FDActivityLog).order_by(FDActivityLog.log_timestamp.desc()).limit(k).all()
-        else:
-            
-            team = db.query(FDTeam).filter(FDTeam.team_name == user.get("team_name")).first()
-            if not team:
-                return []
-            activities = db.query(FDActivityLog)\
-                           .filter(FDActivityLog.team_id == team.team_id)\
-                           .order_by(FDActivityLog.log_timestamp.desc())\
-                           .limit(k).all()
-        return [
-                {
-                    "uuid": activity.log_uuid,
-                    "message": activity.log_message,
-                    "time":activity.log_timestamp
-                } for activity in activities
-            ]
-    except SQLAlchemyError as e:
-        db.rollback()
-        error_msg = str(e.__cause__) if e.__cause__ else str(e)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {error_msg}"
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Something went wrong...")
-    
+SEARCH_PAGE_MAX = int(os.getenv("SEARCH_PAGE_MAX", "100"))
 
 
-async def fetch_project_statistics(user):
-    try:
-        if user.get("flipdocs-admin"):
-            db = next(get_db())
-            project_count = db.query(FDProjectRegistry).count()
-            return {
-                "registered_projects": project_count
-            }
-        else:
-            db = next(get_db())
-            team = db.query(FDTeam).filter(FDTeam.team_name == user.get("team_name")).first()
-            if not team:
-                raise HTTPException(status_code=400, detail="Invalid team name")
-            project_count = db.query(FDProjectRegistry).filter(FDProjectRegistry.team_id == team.team_id).count()
-            return {
-                "registered_projects": project_count
-            }
-    except SQLAlchemyError as e:
-        error_msg = str(e.__cause__) if e.__cause__ else str(e)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {error_msg}"
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Something went wrong...")
-    
+async def search_projects(q: str, fields=None, team_name: str = None, limit: int = 20):
+    """Search all teams' projects by name, team name or URL host (prefix or substring)."""
+    if not q or not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    fields = [field for field in fields or [] if field] or list(SEARCH_FIELDS)
+    unknown = [field for field in fields if field not in SEARCH_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search fields: {', '.join(unknown)}")
+    await ensure_search_loaded()
+    return project_search.search(q, fields, team_name, max(1, min(limit, SEARCH_PAGE_MAX)))
+
+
+async def fetch_project_statistics(user, db: Session):
+    await ensure_stats_loaded()
+    if user.get("flipdocs-admin"):
+        return project_stats.snapshot()
+
+    team = team_directory.lookup(user.get("team_name")) or await run_db(team_directory.resolve, db, user.get("team_name"))
+    if not team:
+        raise HTTPException(status_code=400, detail="Invalid team name")
+    return project_stats.snapshot(team.team_id)
+
+
+async def create_new_team(team, db: Session):
+    return await run_db(_insert_team, db, team)
+
 
-async def create_new_team(team):
+def _insert_team(db: Session, team):
     try:
-        db = next(get_db())
         existing_team = db.query(FDTeam).filter(FDTeam.team_name == team.team_name).first()
         if existing_team:
             raise HTTPException(status_code=400, detail=f"Team with name '{team.team_name}' already exists")
@@ -367,6 +459,13 @@ async def create_new_team(team):
             team_id=new_team.team_id
         )
         db.add(activity)
+        team_id = new_team.team_id
+        def register_team():
+            team_directory.add(team_id, team.team_name)
+            project_stats.add_team(team_id, team.team_name)
+            registry_versions.bump(team_id)
+
+        after_commit(db, register_team)
         db.commit()
         
         return {
@@ -388,10 +487,12 @@ async def create_new_team(team):
         raise HTTPException(status_code=500, detail="Something went wrong when creating the team")
 
 
-async def get_all_teams(user):
+async def get_all_teams(user, db: Session):
+    return await run_db(_list_teams, db, user)
+
+
+def _list_teams(db: Session, user):
     try:
-        db = next(get_db())
-        
         if user.get("flipdocs-admin"):
             teams = db.query(FDTeam).all()
             return {"teams": [{"team_id":team.team_id,"team_name":team.team_name} for team in teams]}
@@ -400,7 +501,7 @@ async def get_all_teams(user):
         if not team_name:
             raise HTTPException(status_code=400, detail="Team name not found in user token")
         
-        team = db.query(FDTeam).filter(FDTeam.team_name == team_name).first()
+        team = team_directory.resolve(db, team_name)
         if not team:
             raise HTTPException(status_code=404, detail=f"Team '{team_name}' not found")
         
@@ -415,120 +516,3 @@ async def get_all_teams(user):
         print(e)
         raise HTTPException(status_code=500, detail="Something went wrong retrieving team data")
     
-
-def sanitize_url(url):
-    if pd.isna(url) or str(url).strip() in ["", "None", "null", "NULL", "none", "N/A", "n/a", "NaN"]:
-        return None
-    return url
-
-
-
-async def upload_projects(file: UploadFile, user: dict, db: Session):
-    filename = file.filename
-    content = await file.read()
-
-    try:
-        if filename.lower().endswith('.csv'):
-            df = pd.read_csv(StringIO(content.decode('utf-8')))
-        elif filename.lower().endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(BytesIO(content))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type. Upload CSV or Excel.")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error reading file: {e}")
-
-    required_cols = ["project-name", "production-url", "pre-production-url", "playground-url"]
-    missing = [col for col in required_cols if col not in df.columns]
-    if missing:
-        raise HTTPException(status_code=422, detail=f"Missing columns: {', '.join(missing)}")
-
-    results = []
-
-    try:
-        for i, row in df.iterrows():
-            project_name = row.get('project-name')
-            if not project_name or str(project_name).strip() in INVALID_VALUES:
-                raise HTTPException(status_code=422, detail=f"Row {i}: Invalid or missing 'project-name'")
-
-            team_name = row.get('team_name')
-            if team_name is None or str(team_name).strip() in INVALID_VALUES:
-                team_name = user.get('team_name')
-
-            team = db.query(FDTeam).filter(FDTeam.team_name == team_name).first()
-            if not team:
-                raise HTTPException(status_code=400, detail=f"Row {i}: Invalid team name '{team_name}'")
-
-            project_data = {
-                "projectname": str(project_name).strip(),
-                "team_name": team_name
-            }
-
-            for col, key in [
-                ('production-url', 'prod_url'),
-                ('pre-production-url', 'pre_prod_url'),
-                ('playground-url', 'pg_url')
-            ]:
-                value = sanitize_url(row.get(col))
-                if value is not None:
-                    project_data[key] = value
-
-            try:
-                project = ProjectCreate(**project_data)
-            except HTTPException as e:
-                raise HTTPException(status_code=e.status_code, detail=f"Row {i}: {e.detail}")
-
-            existing_project = db.query(FDProjectRegistry).filter(
-                FDProjectRegistry.team_id == team.team_id,
-                FDProjectRegistry.project_name == project_data["projectname"]
-            ).first()
-
-            if existing_project:
-                try:
-                    res = await update_existing_project(existing_project.project_uuid, project, user)
-                    results.append(f"Updated: {existing_project.project_name}")
-                except HTTPException as e:
-                    raise HTTPException(status_code=e.status_code, detail=f"Row {i}: {e.detail}")
-            else:
-                try:
-                    res = await create_new_project(project, user, db)
-                    results.append(f"Created: {res['projectname']}")
-                except HTTPException as e:
-                    raise HTTPException(status_code=e.status_code, detail=f"Row {i}: {e.detail}")
-
-        db.commit()
-        return {
-            "filename": filename,
-            "processed": len(results),
-            "results": results
-        }
-
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"{e}")
-
-    
-
-
-MAX_LOGS_PER_TEAM = 30
-
-def enforce_log_limit(db: Session, team_id: str, max_logs: int = MAX_LOGS_PER_TEAM):
-    count = db.query(FDActivityLog).filter(FDActivityLog.team_id == team_id).count()
-
-    logs_to_remove = max(0, count - max_logs + 1)
-    
-    if logs_to_remove > 0:
-        oldest_logs = (
-            db.query(FDActivityLog)
-            .filter(FDActivityLog.team_id == team_id)
-            .order_by(FDActivityLog.log_timestamp.asc())
-            .limit(logs_to_remove)
-            .all()
-        )
-        
-        for log in oldest_logs:
-            db.delete(log)
-            
-        db.flush()
@@ -0,0 +1,68 @@
+import asyncio
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from database.database import run_db, ENV_COLUMNS
+from controllers.swaggerController import get_accessible_project
+from utils.json_codec import envelope
+from utils.spec_snapshots import list_snapshots, load_snapshot, diff_specs
+from fastapi.responses import Response
+
+
+MAX_SNAPSHOT_PAGE = 200
+
+
+def _check_env(env: str):
+    if env not in ENV_COLUMNS:
+        raise HTTPException(status_code=400, detail="Invalid environment specified")
+
+
+def _list_snapshots(db: Session, uuid: str, env: str, limit: int, user):
+    get_accessible_project(db, uuid, user)
+    return list_snapshots(db, uuid, env, limit)
+
+
+async def list_project_snapshots(uuid: str, env: str, limit: int, user, db: Session):
+    _check_env(env)
+    return await run_db(_list_snapshots, db, uuid, env, max(1, min(limit, MAX_SNAPSHOT_PAGE)), user)
+
+
+def _load_snapshot(db: Session, uuid: str, env: str, snapshot_uuid: str, user):
+    project = get_accessible_project(db, uuid, user)
+    snapshot, raw = load_snapshot(db, uuid, env, snapshot_uuid)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return envelope(project.project_name, raw, project.project_uuid)
+
+
+async def get_project_snapshot(uuid: str, env: str, snapshot_uuid: str, user, db: Session):
+    _check_env(env)
+    body = await run_db(_load_snapshot, db, uuid, env, snapshot_uuid, user)
+    return Response(content=body, media_type="application/json")
+
+
+def _load_snapshot_pair(db: Session, uuid: str, env: str, base: str, target: str, user):
+    get_accessible_project(db, uuid, user)
+    if not (base and target):
+        recent = list_snapshots(db, uuid, env, 2)
+        target = target or (recent[0]["snapshot_uuid"] if recent else None)
+        base = base or (recent[1]["snapshot_uuid"] if len(recent) > 1 else None)
+        if not (base and target):
+            raise HTTPException(status_code=404, detail="At least two snapshots are needed for a diff")
+
+    base_snapshot, base_raw = load_snapshot(db, uuid, env, base)
+    target_snapshot, target_raw = load_snapshot(db, uuid, env, target)
+    if base_snapshot is None or target_snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return base_snapshot, base_raw, target_snapshot, target_raw
+
+
+async def diff_project_snapshots(uuid: str, env: str, base: str, target: str, user, db: Session):
+    """Diff two snapshots; defaults to the previous version against the latest one."""
+    _check_env(env)
+    base_snapshot, base_raw, target_snapshot, target_raw = await run_db(_load_snapshot_pair, db, uuid, env, base, target, user)
+    diff = await asyncio.to_thread(diff_specs, base_raw, target_raw)
+    return {
+        "base": {"snapshot_uuid": base_snapshot.snapshot_uuid, "fetched_at": base_snapshot.fetched_at},
+        "target": {"snapshot_uuid": target_snapshot.snapshot_uuid, "fetched_at": target_snapshot.fetched_at},
+        **diff,
+    }
@@ -0,0 +1,591 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from collections import Counter
+from itertools import islice
+
+import pandas as pd
+from openpyxl import load_workbook
+from fastapi import HTTPException, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy import insert, update, func
+from sqlalchemy.orm import Session
+
+from database.database import run_db, SessionLocal, FDProjectRegistry, FDActivityLog, FDUploadJob, IST, ENV_COLUMNS
+from controllers.configController import INVALID_VALUES, validate_project_urls
+from utils.log_retention import enforce_log_limit
+from database.session_hooks import after_commit
+from utils.project_stats import project_stats, env_presence
+from utils.project_search import project_search
+from utils.registry_versions import registry_versions
+from utils.team_directory import team_directory
+from utils.spec_cache import spec_cache
+from utils.spec_snapshots import forget_project, delete_env_snapshots, schedule_blob_prune
+from utils.jobs import upload_pool
+from utils.sql_metrics import begin_job, detach_request, sql_metrics
+from utils.periodic import PeriodicTask
+
+
+UPLOAD_VALIDATION_CONCURRENCY = int(os.getenv("UPLOAD_VALIDATION_CONCURRENCY", "20"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "500"))
+UPLOAD_JOB_MAX_ERRORS = int(os.getenv("UPLOAD_JOB_MAX_ERRORS", "500"))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+# Each worker refreshes heartbeat_at on the jobs it holds this often; 0 disables the
+# heartbeat and with it stale-job recovery, since live jobs could no longer be told apart.
+UPLOAD_JOB_HEARTBEAT_INTERVAL = float(os.getenv("UPLOAD_JOB_HEARTBEAT_INTERVAL", "30"))
+# Queued/running jobs without a heartbeat for this long were lost with their process.
+UPLOAD_JOB_STALE_AFTER = float(os.getenv("UPLOAD_JOB_STALE_AFTER", "300"))
+UPLOAD_SPOOL_PREFIX = "fd-upload-"
+INTERRUPTED = "Interrupted by a server restart, please upload the file again"
+
+# Jobs queued or running in this process, kept alive by the heartbeat.
+_live_jobs = set()
+
+SHEET_URL_HEADERS = {
+    'prod_url': 'production-url',
+    'pre_prod_url': 'pre-production-url',
+    'pg_url': 'playground-url',
+}
+# (sheet header, API field, registry column)
+URL_COLUMNS = [(SHEET_URL_HEADERS[field], field, column) for field, column in ENV_COLUMNS.items()]
+
+
+INVALID_TEXT = [v for v in INVALID_VALUES if isinstance(v, str)]
+
+
+def _clean_column(df, col):
+    """Column as stripped strings with NaN and placeholder values ("N/A", "null", ...) set to NA."""
+    if col not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="string")
+    values = df[col].astype("string").str.strip()
+    return values.mask(values.isin(INVALID_TEXT))
+
+
+def normalize_rows(df, user: dict, seen: dict = None):
+    """Turn sheet rows into project dicts using whole-column operations.
+
+    seen maps (lowercased team, lowercased project name) to the row that first used it
+    and carries across batches; later rows with the same key are reported as
+    duplicates. Returns (rows, failures) where failures are {"row", "error"}
+    dicts for rows that cannot be ingested.
+    """
+    seen = {} if seen is None else seen
+    names = _clean_column(df, 'project-name')
+    if user.get('flipdocs-admin'):
+        teams = _clean_column(df, 'team_name')
+        if user.get('team_name'):
+            teams = teams.fillna(user.get('team_name'))
+    else:
+        teams = pd.Series(user.get('team_name'), index=df.index, dtype="string")
+    # Stored as written, like create_new_project; validate_project_urls adds a missing scheme only to reach them.
+    urls = {key: _clean_column(df, col) for col, key, _ in URL_COLUMNS}
+
+    rows_index = pd.Series(df.index, index=df.index)
+    errors = pd.Series(pd.NA, index=df.index, dtype="string")
+    errors = errors.mask(names.isna(), "Invalid or missing 'project-name'")
+    errors = errors.mask(errors.isna() & teams.isna(), "Missing 'team_name'")
+    no_urls = pd.concat(urls.values(), axis=1).isna().all(axis=1)
+    errors = errors.mask(errors.isna() & no_urls, "At least one URL must be provided")
+
+    # Project names compare case-insensitively, like uq_team_project does under MySQL's collation.
+    keys = teams.str.lower() + "\0" + names.str.lower()
+    candidates = errors.isna()
+    first_row = rows_index[candidates].groupby(keys[candidates]).transform("first")
+    earlier = keys[candidates].map(seen)
+    first_row = earlier.fillna(first_row).astype("int64")
+    duplicate = first_row != rows_index[candidates]
+    errors.loc[duplicate[duplicate].index] = "Duplicate of row " + first_row[duplicate].astype(str)
+    seen.update(dict(zip(keys[candidates][~duplicate], rows_index[candidates][~duplicate])))
+
+    ok = errors.isna()
+    frame = pd.DataFrame({"row": rows_index, "projectname": names, "team_name": teams, **urls})[ok]
+    rows = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    failures = [{"row": int(row), "error": error} for row, error in errors[~ok].items()]
+    return rows, failures
+
+
+async def _validate_rows(rows):
+    """Check every row's URLs concurrently; returns the rows that passed and failures for the rest."""
+    semaphore = asyncio.Semaphore(UPLOAD_VALIDATION_CONCURRENCY)
+
+    async def validate(project):
+        urls = [(key, project[key]) for _, key, _ in URL_COLUMNS if project[key]]
+        async with semaphore:
+            try:
+                await validate_project_urls(urls)
+            except HTTPException as e:
+                return e.detail
+        return None
+
+    errors = await asyncio.gather(*(validate(project) for project in rows))
+    valid = [project for project, error in zip(rows, errors) if error is None]
+    failures = [{"row": project["row"], "error": error} for project, error in zip(rows, errors) if error is not None]
+    return valid, failures
+
+
+async def ingest_rows(db: Session, rows, filename: str):
+    """Validate rows and write the valid ones with one bulk insert and one bulk update.
+
+    Teams come from the team directory and existing projects are preloaded
+    with one query; nothing is committed here so the caller controls the
+    transaction. Returns (results, invalidated, orphans, failures): orphans are
+    the spec blob hashes to prune once the batch commits.
+    """
+    failures = []
+    teams = await run_db(_resolve_teams, db, {project["team_name"] for project in rows})
+    known = []
+    for project in rows:
+        team = teams[project["team_name"]]
+        if not team:
+            failures.append({"row": project["row"], "error": f"Invalid team name '{project['team_name']}'"})
+            continue
+        project["team"] = team
+        known.append(project)
+
+    rows, url_failures = await _validate_rows(known)
+    failures.extend(url_failures)
+    results, invalidated, orphans, write_failures = await run_db(_write_rows, db, rows, filename)
+    failures.extend(write_failures)
+    return results, invalidated, orphans, failures
+
+
+def _resolve_teams(db: Session, team_names):
+    return {name: team_directory.resolve(db, name) for name in team_names}
+
+
+def _write_rows(db: Session, rows, filename: str):
+    # normalize_rows already rejected repeats of a (team, project) key, keeping the first row;
+    # setdefault keeps that rule if a key still repeats.
+    unique = {}
+    for project in rows:
+        unique.setdefault((project["team"].team_id, project["projectname"].lower()), project)
+
+    # Compared on the column itself so uq_team_project serves the lookup; MySQL's
+    # case-insensitive collation matches other spellings of the same name.
+    existing = {
+        (p.team_id, p.project_name.lower()): p
+        for p in db.query(FDProjectRegistry).filter(
+            FDProjectRegistry.team_id.in_({team_id for team_id, _ in unique}),
+            FDProjectRegistry.project_name.in_({project["projectname"] for project in unique.values()}),
+        ).all()
+    } if unique else {}
+
+    now = datetime.now(IST)
+    inserts, updates, results = [], [], []
+    invalidated = []
+    # API-shaped project dicts for the search index.
+    indexed = []
+    counts = {}
+    # (team_id, old env presence, new env presence) -> number of projects, for the statistics.
+    changes = Counter()
+    for key, project in unique.items():
+        values = {column: project[field] for _, field, column in URL_COLUMNS}
+        current = existing.get(key)
+        if current is None:
+            inserts.append((project, {
+                "project_uuid": str(uuid.uuid4()),
+                "project_name": project["projectname"],
+                "team_id": project["team"].team_id,
+                "created_at": now,
+                **values,
+            }))
+            continue
+        updates.append({"project_uuid": current.project_uuid, **values})
+        changed_envs = [field for _, field, column in URL_COLUMNS if getattr(current, column) != values[column]]
+        if changed_envs:
+            invalidated.append((current.project_uuid, changed_envs))
+        counts.setdefault(current.team_id, [0, 0])[1] += 1
+        changes[(current.team_id, tuple(env_presence(current).items()), tuple(env_presence(values).items()))] += 1
+        results.append(f"Updated: {current.project_name}")
+        indexed.append({"uuid": current.project_uuid, "projectname": current.project_name, "team_name": project["team"].team_name,
+                        **{field: project[field] for _, field, _ in URL_COLUMNS}})
+
+    orphans = delete_env_snapshots(db, invalidated)
+    inserted, failures = _insert_projects(db, inserts)
+    for project, row in inserted:
+        counts.setdefault(row["team_id"], [0, 0])[0] += 1
+        changes[(row["team_id"], None, tuple(env_presence(row).items()))] += 1
+        results.append(f"Created: {project['projectname']}")
+        indexed.append({"uuid": row["project_uuid"], "projectname": project["projectname"], "team_name": project["team"].team_name,
+                        **{field: project[field] for _, field, _ in URL_COLUMNS}})
+    if updates:
+        db.execute(update(FDProjectRegistry), updates)
+
+    for team_id, (created, updated) in counts.items():
+        enforce_log_limit(db, team_id)
+        db.add(FDActivityLog(
+            log_uuid=str(uuid.uuid4()),
+            log_message=f"{created} projects added, {updated} updated from '{filename}'"[:255],
+            log_timestamp=now,
+            team_id=team_id,
+        ))
+    db.flush()
+
+    def record_changes():
+        for (team_id, old, new), count in changes.items():
+            project_stats.apply(team_id, old and dict(old), dict(new), count)
+        for entry in indexed:
+            project_search.upsert(entry)
+        registry_versions.bump(*counts)
+
+    after_commit(db, record_changes)
+    return results, invalidated, orphans, failures
+
+
+def _insert_projects(db: Session, inserts):
+    """Bulk insert (project, row) pairs; returns (inserted pairs, row failures).
+
+    A unique-key conflict (a project created concurrently, or a name that the
+    database collates equal to an existing one) only fails that row: the batch
+    is retried row by row, each in its own savepoint.
+    """
+    if not inserts:
+        return [], []
+    try:
+        with db.begin_nested():
+            db.execute(insert(FDProjectRegistry), [row for _, row in inserts])
+        return inserts, []
+    except IntegrityError:
+        pass
+
+    inserted, failures = [], []
+    for project, row in inserts:
+        try:
+            with db.begin_nested():
+                db.execute(insert(FDProjectRegistry), [row])
+            inserted.append((project, row))
+        except IntegrityError:
+            failures.append({"row": project["row"], "error": f"Project '{project['projectname']}' already exists in team '{project['team'].team_name}'"})
+    return inserted, failures
+
+
+def iter_upload_batches(fileobj, filename: str, batch_size: int = UPLOAD_BATCH_SIZE):
+    """Yield DataFrames of at most batch_size rows without loading the whole sheet.
+
+    CSV is parsed incrementally; .xlsx is read row by row in openpyxl's
+    read-only mode. Legacy .xls has no streaming reader and is read at once.
+    Row labels keep counting across batches so errors report the sheet row.
+    """
+    name = filename.lower()
+    fileobj.seek(0)
+    if name.endswith('.csv'):
+        text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+        try:
+            yield from pd.read_csv(text, chunksize=batch_size)
+        finally:
+            text.detach()
+    elif name.endswith('.xlsx'):
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                raise ValueError("No columns to parse from file")
+            columns = [str(col) if col is not None else "" for col in header]
+            start = 0
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+                yield pd.DataFrame(chunk, columns=columns, index=range(start, start + len(chunk)))
+                start += len(chunk)
+        finally:
+            workbook.close()
+    elif name.endswith('.xls'):
+        df = pd.read_excel(fileobj)
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size]
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Upload CSV or Excel.")
+
+
+async def _next_batch(batches):
+    try:
+        return await asyncio.to_thread(next, batches, None)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading file: {e}")
+
+
+def _job_summary(job: FDUploadJob) -> dict:
+    return {
+        "job_id": job.job_id,
+        "filename": job.filename,
+        "status": job.status,
+        "processed": job.processed,
+        "created": job.created,
+        "updated": job.updated,
+        "failed": job.failed,
+        "errors": json.loads(job.errors) if job.errors else [],
+        "detail": job.detail,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "heartbeat_at": job.heartbeat_at,
+    }
+
+
+def _create_job(db: Session, filename: str, user: dict, path: str):
+    try:
+        now = datetime.now(IST)
+        job = FDUploadJob(
+            job_id=str(uuid.uuid4()),
+            filename=filename[:255],
+            team_name=user.get("team_name"),
+            status="queued",
+            created_at=now,
+            heartbeat_at=now,
+            spool_path=path,
+        )
+        db.add(job)
+        db.commit()
+        return _job_summary(job)
+    except SQLAlchemyError as e:
+        db.rollback()
+        error_msg = str(e.__cause__) if e.__cause__ else str(e)
+        raise HTTPException(status_code=500, detail=f"Database error: {error_msg}")
+
+
+async def upload_projects(file: UploadFile, user: dict, db: Session):
+    """Spool the upload to disk and queue it; the caller polls the returned job."""
+    filename = file.filename or "upload"
+    name = filename.lower()
+    if not name.endswith(('.csv', '.xls', '.xlsx')):
+        raise HTTPException(status_code=400, detail="Unsupported file type. Upload CSV or Excel.")
+
+    fd, path = tempfile.mkstemp(prefix=UPLOAD_SPOOL_PREFIX, suffix=os.path.splitext(name)[1], dir=UPLOAD_TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(1024 * 1024):
+                await asyncio.to_thread(out.write, chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+
+    try:
+        summary = await run_db(_create_job, db, filename, user, path)
+    except HTTPException:
+        os.unlink(path)
+        raise
+
+    _live_jobs.add(summary["job_id"])
+    upload_pool.submit(
+        lambda: run_upload_job(summary["job_id"], path, filename, user),
+        on_cancel=lambda: abandon_upload_job(summary["job_id"], path),
+    )
+    return JSONResponse(status_code=202, content=jsonable_encoder(summary))
+
+
+def _start_job(db: Session, job_id: str):
+    job = db.get(FDUploadJob, job_id)
+    job.status = "running"
+    job.started_at = job.heartbeat_at = datetime.now(IST)
+    db.commit()
+
+
+def _record_batch(db: Session, job_id: str, processed: int, results, failures, errors):
+    """Commit the batch's rows together with the job's progress counters."""
+    job = db.get(FDUploadJob, job_id)
+    job.processed += processed
+    job.created += sum(1 for r in results if r.startswith("Created"))
+    job.updated += sum(1 for r in results if r.startswith("Updated"))
+    job.failed += len(failures)
+    job.errors = json.dumps(sorted(errors, key=lambda e: e["row"]), default=str)
+    db.commit()
+    # Flushed rows are committed; release the ORM objects before the next batch.
+    db.expunge_all()
+
+
+def _finish_job(db: Session, job_id: str, detail: str = None):
+    db.rollback()
+    job = db.get(FDUploadJob, job_id)
+    job.status = "failed" if detail is not None else "completed"
+    job.detail = detail
+    job.finished_at = datetime.now(IST)
+    db.commit()
+
+
+async def run_upload_job(job_id: str, path: str, filename: str, user: dict):
+    """Process a spooled upload batch by batch, committing and recording progress after each batch."""
+    required_cols = ["project-name", "production-url", "pre-production-url", "playground-url"]
+    db = SessionLocal()
+    errors = []
+    seen = {}
+    try:
+        await run_db(_start_job, db, job_id)
+
+        with open(path, "rb") as fileobj:
+            batches = iter_upload_batches(fileobj, filename)
+            try:
+                df = await _next_batch(batches)
+                if df is None:
+                    raise HTTPException(status_code=400, detail="Error reading file: No columns to parse from file")
+                missing = [col for col in required_cols if col not in df.columns]
+                if missing:
+                    raise HTTPException(status_code=422, detail=f"Missing columns: {', '.join(missing)}")
+
+                while df is not None:
+                    # Each batch is reported like a request, so repeated statements show up per batch.
+                    stats = begin_job("upload batch")
+                    rows, failures = normalize_rows(df, user, seen)
+                    results, invalidated, orphans, ingest_failures = await ingest_rows(db, rows, filename)
+                    failures.extend(ingest_failures)
+
+                    errors.extend(failures[:max(0, UPLOAD_JOB_MAX_ERRORS - len(errors))])
+                    await run_db(_record_batch, db, job_id, len(df), results, failures, errors)
+                    sql_metrics.record_request(stats.endpoint, stats)
+                    detach_request()
+                    for project_uuid, envs in invalidated:
+                        spec_cache.invalidate_project(project_uuid, envs)
+                        forget_project(project_uuid, envs)
+                    schedule_blob_prune(orphans)
+                    df = await _next_batch(batches)
+            finally:
+                batches.close()
+
+        await run_db(_finish_job, db, job_id)
+    except asyncio.CancelledError:
+        await run_db(_finish_job, db, job_id, INTERRUPTED)
+        raise
+    except Exception as e:
+        await run_db(_finish_job, db, job_id, str(e.detail if isinstance(e, HTTPException) else e)[:1024])
+    finally:
+        # The pool's worker task runs the next job in this same context.
+        detach_request()
+        _live_jobs.discard(job_id)
+        await run_db(db.close)
+        os.unlink(path)
+
+
+async def abandon_upload_job(job_id: str, path: str):
+    """Fail a job that was still queued when the pool stopped and drop its spooled file."""
+    db = SessionLocal()
+    try:
+        await run_db(_finish_job, db, job_id, INTERRUPTED)
+    finally:
+        _live_jobs.discard(job_id)
+        await run_db(db.close)
+        os.unlink(path)
+
+
+def beat_upload_jobs(job_ids):
+    """Refresh heartbeat_at on the jobs this process still holds."""
+    if not job_ids:
+        return
+    db = SessionLocal()
+    try:
+        (
+            db.query(FDUploadJob)
+            .filter(FDUploadJob.job_id.in_(job_ids), FDUploadJob.status.in_(("queued", "running")))
+            .update({"heartbeat_at": datetime.now(IST)}, synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def fail_stale_upload_jobs():
+    """Fail jobs whose worker stopped sending heartbeats and delete their spooled files.
+
+    Jobs held by live workers keep a fresh heartbeat_at and are left alone,
+    as are their files. A job is only failed by the UPDATE that still sees it
+    stale, so a worker that beats in between keeps it.
+    """
+    if UPLOAD_JOB_HEARTBEAT_INTERVAL <= 0:
+        return
+    cutoff = datetime.now(IST) - timedelta(seconds=UPLOAD_JOB_STALE_AFTER)
+    stale = [
+        FDUploadJob.status.in_(("queued", "running")),
+        func.coalesce(FDUploadJob.heartbeat_at, FDUploadJob.created_at) < cutoff,
+    ]
+    db = SessionLocal()
+    try:
+        candidates = [
+            (job_id, spool_path)
+            for job_id, spool_path in db.query(FDUploadJob.job_id, FDUploadJob.spool_path).filter(*stale).all()
+            if job_id not in _live_jobs
+        ]
+        failed = []
+        for job_id, spool_path in candidates:
+            claimed = (
+                db.query(FDUploadJob)
+                .filter(FDUploadJob.job_id == job_id, *stale)
+                .update({"status": "failed", "detail": INTERRUPTED, "finished_at": datetime.now(IST)}, synchronize_session=False)
+            )
+            db.commit()
+            if claimed:
+                failed.append(spool_path)
+    finally:
+        db.close()
+
+    removed = 0
+    for spool_path in failed:
+        if not spool_path:
+            continue
+        try:
+            os.unlink(spool_path)
+            removed += 1
+        except OSError:
+            # Spooled on another host, or already gone.
+            pass
+    if failed:
+        print(f"Upload recovery: {len(failed)} interrupted jobs failed, {removed} spooled files removed")
+
+
+async def recover_upload_jobs():
+    try:
+        await asyncio.to_thread(fail_stale_upload_jobs)
+    except Exception as e:
+        print(f"Upload recovery failed: {e}")
+
+
+async def _heartbeat():
+    await asyncio.to_thread(beat_upload_jobs, list(_live_jobs))
+    await asyncio.to_thread(fail_stale_upload_jobs)
+
+
+upload_heartbeat = PeriodicTask("Upload job heartbeat", UPLOAD_JOB_HEARTBEAT_INTERVAL, _heartbeat, delay_first=True)
+
+
+def start_upload_heartbeat():
+    upload_heartbeat.start()
+
+
+async def stop_upload_heartbeat():
+    await upload_heartbeat.stop()
+
+
+def _can_see_job(job: FDUploadJob, user: dict) -> bool:
+    if user.get("flipdocs-admin"):
+        return True
+    return (job.team_name or "").lower() == (user.get("team_name") or "").lower()
+
+
+def _get_job(db: Session, job_id: str, user: dict):
+    job = db.get(FDUploadJob, job_id)
+    if not job or not _can_see_job(job, user):
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return _job_summary(job)
+
+
+async def get_upload_job(job_id: str, user: dict, db: Session):
+    return await run_db(_get_job, db, job_id, user)
+
+
+def _list_jobs(db: Session, user: dict, limit: int):
+    query = db.query(FDUploadJob)
+    if not user.get("flipdocs-admin"):
+        query = query.filter(FDUploadJob.team_name == user.get("team_name"))
+    jobs = query.order_by(FDUploadJob.created_at.desc()).limit(limit).all()
+    return [_job_summary(job) for job in jobs]
+
+
+async def list_upload_jobs(user: dict, limit: int, db: Session):
+    return await run_db(_list_jobs, db, user, max(1, min(limit, 100)))
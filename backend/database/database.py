@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine, Column, String, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy import create_engine, Column, String, DateTime, ForeignKey, Index, UniqueConstraint, Integer, LargeBinary, Text
+from sqlalchemy.dialects.mysql import LONGBLOB, MEDIUMTEXT
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from datetime import datetime, timezone, timedelta
 import uuid
 import os
 from dotenv import dotenv_values
+from starlette.concurrency import run_in_threadpool
+from utils.sql_metrics import instrument_engine
 
 if os.getenv("ENV") != "production":
     config = dotenv_values(".env")
@@ -18,9 +21,28 @@ DB_HOST = os.getenv("DB_LOCAL_HOST")
 DB_PORT = os.getenv("DB_LOCAL_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL overrides the DB_* settings, e.g. to run the tests against SQLite.
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL, echo=True, future=True)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Recycle connections before MySQL's wait_timeout closes them server-side.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=DB_ECHO,
+    future=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
+)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -30,6 +52,11 @@ def get_db():
     finally:
         db.close()
 
+
+async def run_db(fn, *args, **kwargs):
+    """Run blocking session work on the threadpool so queries never stall the event loop."""
+    return await run_in_threadpool(fn, *args, **kwargs)
+
 Base = declarative_base()
 
 # --- Models ---
@@ -40,6 +67,13 @@ class FDTeam(Base):
     team_name = Column(String(255), nullable=False, unique=True)
     created_at = Column(DateTime, default=lambda: datetime.now(IST), nullable=False)
 
+# API environment field -> FDProjectRegistry URL column.
+ENV_COLUMNS = {
+    "prod_url": "production_url",
+    "pre_prod_url": "pre_production_url",
+    "pg_url": "playground_url",
+}
+
 class FDProjectRegistry(Base):
     __tablename__ = "fd_project_registry"
     project_uuid = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -54,6 +88,7 @@ class FDProjectRegistry(Base):
 
     __table_args__ = (
         Index("idx_project_name", "project_name"),
+        Index("idx_project_team_created", "team_id", "created_at"),
         UniqueConstraint("team_id", "project_name", name="uq_team_project"),
     )
 
@@ -67,6 +102,54 @@ class FDActivityLog(Base):
 
     __table_args__ = (
         Index("idx_log_timestamp", "log_timestamp"),
+        Index("idx_log_team_timestamp", "team_id", "log_timestamp"),
+    )
+
+class FDSpecBlob(Base):
+    __tablename__ = "fd_spec_blob"
+    content_hash = Column(String(64), primary_key=True)
+    content = Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(IST), nullable=False)
+
+class FDSpecSnapshot(Base):
+    __tablename__ = "fd_spec_snapshot"
+    snapshot_uuid = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_uuid = Column(String(36), ForeignKey("fd_project_registry.project_uuid", ondelete="CASCADE"), nullable=False)
+    env = Column(String(20), nullable=False)
+    content_hash = Column(String(64), ForeignKey("fd_spec_blob.content_hash"), nullable=False)
+    fetched_at = Column(DateTime, default=lambda: datetime.now(IST), nullable=False)
+
+    __table_args__ = (
+        Index("idx_snapshot_project_env_time", "project_uuid", "env", "fetched_at"),
+    )
+
+class FDUploadJob(Base):
+    __tablename__ = "fd_upload_job"
+    job_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    filename = Column(String(255), nullable=False)
+    team_name = Column(String(255), nullable=True)
+    status = Column(String(20), nullable=False, default="queued")
+    processed = Column(Integer, nullable=False, default=0)
+    created = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    # JSON list of up to UPLOAD_JOB_MAX_ERRORS row errors; can outgrow MySQL's 64KB TEXT.
+    errors = Column(Text().with_variant(MEDIUMTEXT, "mysql"), nullable=True)
+    detail = Column(String(1024), nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(IST), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Refreshed by the worker process holding the job; a stale value means that process is gone.
+    heartbeat_at = Column(DateTime, nullable=True)
+    spool_path = Column(String(1024), nullable=True)
+
+    __table_args__ = (
+        Index("idx_upload_job_team_created", "team_name", "created_at"),
     )
 
 Base.metadata.create_all(bind=engine)
+# create_all skips tables that already exist, so add indexes introduced after the table was created.
+for table in (FDActivityLog.__table__, FDProjectRegistry.__table__):
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
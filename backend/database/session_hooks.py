@@ -0,0 +1,24 @@
+from sqlalchemy import event
+
+from database.database import SessionLocal
+
+
+def after_commit(db, callback):
+    """Run callback once db's current transaction commits; dropped on rollback."""
+    db.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _run_after_commit(session):
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception as e:
+            print(f"after_commit callback failed: {e}")
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _drop_after_commit(session, previous_transaction):
+    # Rolling back a savepoint keeps the outer transaction, and its callbacks, alive.
+    if previous_transaction.parent is None:
+        session.info.pop("after_commit", None)
@@ -0,0 +1,20 @@
+from fastapi import Depends, HTTPException, Request, Response
+from .permissions import require_read_permission
+from utils.registry_versions import registry_versions, etag_matches
+from utils.team_directory import team_directory
+
+def registry_etag(request: Request, response: Response, user: dict = Depends(require_read_permission)):
+    # Admins see every team, so their ETags follow the all-teams counter.
+    if user.get("flipdocs-admin"):
+        team_id = None
+    else:
+        team = team_directory.lookup(user.get("team_name"))
+        if team is None:
+            return
+        team_id = team.team_id
+
+    etag = registry_versions.etag(team_id, f"{request.url.path}?{request.url.query}")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
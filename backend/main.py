@@ -1,9 +1,45 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from routes.swagger import router as swagger_routes
 from routes.config import router as config_routes
+from routes.metrics import router as metrics_routes
+from utils.http_client import init_http_client, close_http_client
+from utils.spec_refresher import start_spec_refresher, stop_spec_refresher
+from utils.jobs import upload_pool
+from controllers.uploadController import recover_upload_jobs, start_upload_heartbeat, stop_upload_heartbeat
+from utils.log_retention import start_log_compactor, stop_log_compactor
+from utils.project_stats import start_stats_reconciler, stop_stats_reconciler
+from utils.team_directory import start_team_directory, stop_team_directory
+from utils.project_search import start_project_search, stop_project_search
+from utils.sql_metrics import begin_request, sql_metrics
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_http_client()
+    await start_team_directory()
+    await start_project_search()
+    start_spec_refresher()
+    await recover_upload_jobs()
+    upload_pool.start()
+    start_upload_heartbeat()
+    await start_log_compactor()
+    start_stats_reconciler()
+    try:
+        yield
+    finally:
+        await stop_stats_reconciler()
+        await stop_log_compactor()
+        await stop_upload_heartbeat()
+        await upload_pool.stop()
+        await stop_spec_refresher()
+        await stop_project_search()
+        await stop_team_directory()
+        await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,3 +51,13 @@ app.add_middleware(
 
 app.include_router(swagger_routes)
 app.include_router(config_routes)
+app.include_router(metrics_routes)
+
+
+@app.middleware("http")
+async def sql_instrumentation(request: Request, call_next):
+    stats = begin_request(request.method, request.scope)
+    response = await call_next(request)
+    sql_metrics.record_request(stats.endpoint, stats)
+    response.headers["Server-Timing"] = f"db;dur={stats.db_time * 1000:.1f};desc=\"{stats.queries} queries\""
+    return response
@@ -1,17 +1,21 @@
+from datetime import datetime
+from typing import List
 from fastapi import APIRouter, Query, Depends, File, UploadFile
 from controllers.configController import (
     create_new_project,
     retrieve_team_projects,
     update_existing_project,
     delete_existing_project,
-    fetch_recent_activity_logs,
     fetch_project_statistics,
     create_new_team,
     get_all_teams,
-    upload_projects,
+    search_projects,
 )
+from controllers.activityController import fetch_recent_activity_logs, fetch_activity_logs, ACTIVITY_TYPES
+from controllers.uploadController import upload_projects, get_upload_job, list_upload_jobs
 from pydantic import BaseModel
 from dependencies.permissions import require_read_permission, require_write_permission, require_admin_permission
+from dependencies.conditional import registry_etag
 from database.database import get_db
 from sqlalchemy.orm import Session
 
@@ -29,46 +33,77 @@ class TeamCreate(BaseModel):
 router = APIRouter()
 
 @router.post("/teams/add", dependencies=[Depends(require_admin_permission)])
-async def route_create_team(team: TeamCreate):
-    return await create_new_team(team)
+async def route_create_team(team: TeamCreate, db: Session = Depends(get_db)):
+    return await create_new_team(team, db)
 
 @router.post("/projects/add", dependencies=[Depends(require_write_permission)])
 async def route_create_project(body: ProjectCreate, user: dict = Depends(require_write_permission),db: Session = Depends(get_db)):
-    result=await create_new_project(body,user,db)
-    db.commit()
-    return result
-
-@router.get("/projects/team/get/all", dependencies=[Depends(require_read_permission)])
-async def route_get_team_projects(team_name: str = None, user: dict = Depends(require_read_permission)):
-    return await retrieve_team_projects(team_name,user)
-
+    return await create_new_project(body,user,db)
+
+@router.get("/projects/team/get/all", dependencies=[Depends(require_read_permission), Depends(registry_etag)])
+async def route_get_team_projects(team_name: str = None,
+                                  limit: int = Query(None, description="Page size; when set the response is {items, next_cursor}"),
+                                  cursor: str = Query(None, description="next_cursor from the previous page"),
+                                  sort: str = Query(None, description="name, created; prefix '-' for descending"),
+                                  q: str = Query(None, description="Project name prefix"),
+                                  has: List[str] = Query(None, description="Only projects with these URLs set: prod_url, pre_prod_url, pg_url"),
+                                  missing: List[str] = Query(None, description="Only projects without these URLs set"),
+                                  fields: str = Query(None, description="Comma-separated fields to return"),
+                                  user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await retrieve_team_projects(team_name, user, db, limit, cursor, sort, q, has, missing, fields)
+
+@router.get("/projects/search", dependencies=[Depends(require_admin_permission)])
+async def route_search_projects(q: str = Query(..., description="Prefix or substring (3+ characters) to look for"),
+                                field: List[str] = Query(None, description="Restrict to: name, team, host"),
+                                team_name: str = Query(None, description="Only projects of this team"),
+                                limit: int = Query(20, description="Number of results, capped server-side")):
+    return await search_projects(q, field, team_name, limit)
 
 @router.put("/projects/update/{project_uuid}", dependencies=[Depends(require_write_permission)])
-async def route_update_project(project_uuid: str, body: ProjectCreate, user: dict = Depends(require_write_permission)):
-    return await update_existing_project(project_uuid, body,user)
+async def route_update_project(project_uuid: str, body: ProjectCreate, user: dict = Depends(require_write_permission), db: Session = Depends(get_db)):
+    return await update_existing_project(project_uuid, body,user,db)
 
 @router.delete("/projects/delete/{uuid}", dependencies=[Depends(require_write_permission)])
-async def route_delete_project(uuid: str, user: dict = Depends(require_write_permission)):
-    return await delete_existing_project(uuid,user)
+async def route_delete_project(uuid: str, user: dict = Depends(require_write_permission), db: Session = Depends(get_db)):
+    return await delete_existing_project(uuid,user,db)
 
 
-@router.get("/activities/recent", dependencies=[Depends(require_read_permission)])
+@router.get("/activities/recent", dependencies=[Depends(require_read_permission), Depends(registry_etag)])
 async def route_get_recent_activities(k: int = Query(10, description="Number of recent activities to retrieve"),
-                                      user: dict = Depends(require_read_permission)):
-    return await fetch_recent_activity_logs(k,user)
+                                      user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await fetch_recent_activity_logs(k,user,db)
+
+@router.get("/activities", dependencies=[Depends(require_read_permission)])
+async def route_get_activities(limit: int = Query(20, description="Page size, capped server-side"),
+                               cursor: str = Query(None, description="next_cursor from the previous page"),
+                               team_name: str = Query(None, description="Admins only: restrict to one team"),
+                               since: datetime = Query(None, description="Only entries at or after this time"),
+                               until: datetime = Query(None, description="Only entries before this time"),
+                               type: List[str] = Query(None, description=f"Message types: {', '.join(ACTIVITY_TYPES)}"),
+                               user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await fetch_activity_logs(user, db, limit, cursor, team_name, since, until, type)
 
-@router.get("/statistics", dependencies=[Depends(require_read_permission)])
-async def route_get_statistics(user: dict = Depends(require_read_permission)):
-    return await fetch_project_statistics(user)
+@router.get("/statistics", dependencies=[Depends(require_read_permission), Depends(registry_etag)])
+async def route_get_statistics(user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await fetch_project_statistics(user, db)
 
-@router.get("/teams/get/all", dependencies=[Depends(require_read_permission)])
-async def route_get_teams(user: dict = Depends(require_read_permission)):
-    return await get_all_teams(user)
+@router.get("/teams/get/all", dependencies=[Depends(require_read_permission), Depends(registry_etag)])
+async def route_get_teams(user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await get_all_teams(user, db)
 
 
 
-@router.post("/upload/", dependencies=[Depends(require_write_permission)])
-async def route_upload_file(file: UploadFile = File(...),user: dict = Depends(require_read_permission),db: Session = Depends(get_db)):
+@router.post("/upload/", dependencies=[Depends(require_write_permission)], status_code=202)
+async def route_upload_file(file: UploadFile = File(...),user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
     return await upload_projects(file,user,db)
 
+@router.get("/upload/jobs", dependencies=[Depends(require_read_permission)])
+async def route_list_upload_jobs(limit: int = Query(20, description="Number of recent upload jobs to retrieve"),
+                                 user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await list_upload_jobs(user, limit, db)
+
+@router.get("/upload/jobs/{job_id}", dependencies=[Depends(require_read_permission)])
+async def route_get_upload_job(job_id: str, user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await get_upload_job(job_id, user, db)
+
 
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Depends, Query
+from dependencies.permissions import require_admin_permission
+from utils.sql_metrics import sql_metrics
+
+router = APIRouter()
+
+@router.get("/metrics/sql", dependencies=[Depends(require_admin_permission)])
+async def route_get_sql_metrics(top: int = Query(20, description="Number of statements to list, by total DB time")):
+    return sql_metrics.snapshot(max(1, min(top, 200)))
@@ -1,24 +1,68 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, Depends, Query
 from controllers.swaggerController import (
     get_all_swagger_docs,
     get_project_swagger_by_uuid_and_env,
+    get_project_swagger_outline,
+    get_project_swagger_tag_slice,
+    get_project_swagger_path_slice,
     fetch_event_configs,
     post_event_configs,
     put_event_configs,
     patch_event_configs,
     delete_event_configs
 )
+from controllers.snapshotController import (
+    list_project_snapshots,
+    get_project_snapshot,
+    diff_project_snapshots,
+)
 from dependencies.permissions import require_read_permission,require_admin_permission
+from database.database import get_db
+from sqlalchemy.orm import Session
 
 router = APIRouter()
 
 @router.get("/swagger/get/all",  dependencies=[Depends(require_admin_permission)])
-async def route_get_all_swagger_docs():
-    return await get_all_swagger_docs()
+async def route_get_all_swagger_docs(request: Request,
+                                     format: str = Query("json", description="'json' for a JSON array or 'ndjson' for one spec per line"),
+                                     db: Session = Depends(get_db)):
+    ndjson = format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    return await get_all_swagger_docs(db, ndjson, request.headers.get("accept-encoding", ""))
 
 @router.get("/swagger/get/{uuid}/{env}", dependencies=[Depends(require_read_permission)])
-async def route_get_project_swagger_by_uuid_and_env(uuid: str, env: str,user: dict = Depends(require_read_permission)):
-    return await get_project_swagger_by_uuid_and_env(uuid, env,user)
+async def route_get_project_swagger_by_uuid_and_env(uuid: str, env: str, request: Request, user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await get_project_swagger_by_uuid_and_env(uuid, env,user, db, request.headers.get("accept-encoding", ""))
+
+@router.get("/swagger/get/{uuid}/{env}/outline", dependencies=[Depends(require_read_permission)])
+async def route_get_project_swagger_outline(uuid: str, env: str, request: Request, user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await get_project_swagger_outline(uuid, env, user, db, request.headers.get("accept-encoding", ""))
+
+@router.get("/swagger/get/{uuid}/{env}/tags/{tag}", dependencies=[Depends(require_read_permission)])
+async def route_get_project_swagger_tag_slice(uuid: str, env: str, tag: str, request: Request, user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await get_project_swagger_tag_slice(uuid, env, tag, user, db, request.headers.get("accept-encoding", ""))
+
+@router.get("/swagger/get/{uuid}/{env}/paths", dependencies=[Depends(require_read_permission)])
+async def route_get_project_swagger_path_slice(uuid: str, env: str, request: Request,
+                                               path: str = Query(..., description="Path template exactly as in the spec, e.g. /pets/{id}"),
+                                               user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await get_project_swagger_path_slice(uuid, env, path, user, db, request.headers.get("accept-encoding", ""))
+
+@router.get("/swagger/snapshots/{uuid}/{env}", dependencies=[Depends(require_read_permission)])
+async def route_list_project_snapshots(uuid: str, env: str,
+                                       limit: int = Query(50, description="Maximum number of snapshots to return"),
+                                       user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await list_project_snapshots(uuid, env, limit, user, db)
+
+@router.get("/swagger/snapshots/{uuid}/{env}/diff", dependencies=[Depends(require_read_permission)])
+async def route_diff_project_snapshots(uuid: str, env: str,
+                                       base: str = Query(None, description="Older snapshot, defaults to the previous one"),
+                                       target: str = Query(None, description="Newer snapshot, defaults to the latest one"),
+                                       user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await diff_project_snapshots(uuid, env, base, target, user, db)
+
+@router.get("/swagger/snapshots/{uuid}/{env}/{snapshot_uuid}", dependencies=[Depends(require_read_permission)])
+async def route_get_project_snapshot(uuid: str, env: str, snapshot_uuid: str, user: dict = Depends(require_read_permission), db: Session = Depends(get_db)):
+    return await get_project_snapshot(uuid, env, snapshot_uuid, user, db)
 
 @router.get("/swagger-fetch")
 async def route_fetch_event_configs(request: Request):
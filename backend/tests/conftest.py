@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.database creates the engine and tables on import, so point it at SQLite first.
+_db_dir = tempfile.mkdtemp(prefix="flipdocs-tests-")
+os.environ["ENV"] = "production"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+
+@pytest.fixture
+def db():
+    from database.database import Base, SessionLocal, engine
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
@@ -0,0 +1,108 @@
+import pandas as pd
+
+from controllers.configController import ensure_scheme
+from controllers.uploadController import normalize_rows
+
+
+MEMBER = {"team_name": "Payments"}
+ADMIN = {"flipdocs-admin": True}
+
+
+def sheet(rows, start=0):
+    columns = ["project-name", "production-url", "pre-production-url", "playground-url"]
+    if rows and len(rows[0]) == 5:
+        columns.append("team_name")
+    return pd.DataFrame(rows, columns=columns, index=range(start, start + len(rows)))
+
+
+def test_rows_become_project_dicts():
+    rows, failures = normalize_rows(sheet([[" orders ", "orders.example.com", None, "HTTPS://pg.example.com"]]), MEMBER)
+
+    assert failures == []
+    assert rows == [{
+        "row": 0,
+        "projectname": "orders",
+        "team_name": "Payments",
+        "prod_url": "orders.example.com",
+        "pre_prod_url": None,
+        "pg_url": "HTTPS://pg.example.com",
+    }]
+
+
+def test_placeholders_count_as_missing():
+    rows, failures = normalize_rows(sheet([
+        ["N/A", "https://a.example.com", None, None],
+        ["billing", "null", "None", " "],
+        ["ledger", "NaN", "https://ledger.example.com", "n/a"],
+    ]), MEMBER)
+
+    assert failures == [
+        {"row": 0, "error": "Invalid or missing 'project-name'"},
+        {"row": 1, "error": "At least one URL must be provided"},
+    ]
+    assert [(r["projectname"], r["prod_url"], r["pre_prod_url"], r["pg_url"]) for r in rows] == [
+        ("ledger", None, "https://ledger.example.com", None),
+    ]
+
+
+def test_admin_rows_need_a_team():
+    rows, failures = normalize_rows(sheet([
+        ["orders", "https://orders.example.com", None, None, "Payments"],
+        ["billing", "https://billing.example.com", None, None, None],
+    ]), ADMIN)
+
+    assert [r["team_name"] for r in rows] == ["Payments"]
+    assert failures == [{"row": 1, "error": "Missing 'team_name'"}]
+
+
+def test_admin_team_defaults_to_their_own():
+    rows, _ = normalize_rows(sheet([["orders", "https://orders.example.com", None, None, None]]), {**ADMIN, "team_name": "Core"})
+
+    assert rows[0]["team_name"] == "Core"
+
+
+def test_member_rows_always_use_their_team():
+    rows, _ = normalize_rows(sheet([["orders", "https://orders.example.com", None, None, "Other"]]), MEMBER)
+
+    assert rows[0]["team_name"] == "Payments"
+
+
+def test_duplicates_compare_case_insensitively_within_a_team():
+    rows, failures = normalize_rows(sheet([
+        ["Orders", "https://a.example.com", None, None, "Payments"],
+        ["orders", "https://b.example.com", None, None, "payments"],
+        ["orders", "https://c.example.com", None, None, "Core"],
+    ]), ADMIN)
+
+    assert [(r["row"], r["team_name"]) for r in rows] == [(0, "Payments"), (2, "Core")]
+    assert failures == [{"row": 1, "error": "Duplicate of row 0"}]
+
+
+def test_duplicates_are_found_across_batches():
+    seen = {}
+    first, _ = normalize_rows(sheet([["orders", "https://a.example.com", None, None]]), MEMBER, seen)
+    second, failures = normalize_rows(sheet([
+        ["ORDERS", "https://b.example.com", None, None],
+        ["billing", "https://c.example.com", None, None],
+    ], start=1), MEMBER, seen)
+
+    assert [r["row"] for r in first] == [0]
+    assert [r["row"] for r in second] == [2]
+    assert failures == [{"row": 1, "error": "Duplicate of row 0"}]
+
+
+def test_invalid_rows_do_not_claim_a_name():
+    rows, failures = normalize_rows(sheet([
+        ["orders", None, None, None],
+        ["orders", "https://orders.example.com", None, None],
+    ]), MEMBER)
+
+    assert [r["row"] for r in rows] == [1]
+    assert failures == [{"row": 0, "error": "At least one URL must be provided"}]
+
+
+def test_ensure_scheme():
+    assert ensure_scheme("orders.example.com") == "http://orders.example.com"
+    assert ensure_scheme("https://orders.example.com") == "https://orders.example.com"
+    assert ensure_scheme("HTTPS://orders.example.com") == "HTTPS://orders.example.com"
+    assert ensure_scheme("Http://orders.example.com") == "Http://orders.example.com"
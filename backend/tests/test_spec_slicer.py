@@ -0,0 +1,124 @@
+import pytest
+
+from utils.json_codec import dumps, loads
+from utils.spec_slicer import SpecIndex
+
+
+SPEC = {
+    "openapi": "3.0.0",
+    "info": {"title": "Orders", "version": "1"},
+    "tags": [{"name": "orders", "description": "Order endpoints"}, {"name": "admin"}],
+    "paths": {
+        "/orders": {
+            "parameters": [{"$ref": "#/components/parameters/Page"}],
+            "get": {
+                "tags": ["orders"],
+                "operationId": "listOrders",
+                "responses": {"200": {"$ref": "#/components/responses/OrderList"}},
+            },
+            "post": {
+                "tags": ["admin"],
+                "operationId": "createOrder",
+                "requestBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Order"}}}},
+                "responses": {"201": {"description": "created"}},
+            },
+        },
+        "/health": {"get": {"responses": {"200": {"description": "ok"}}}},
+    },
+    "components": {
+        "parameters": {"Page": {"name": "page", "in": "query", "schema": {"type": "integer"}}},
+        "responses": {
+            "OrderList": {
+                "description": "orders",
+                "content": {"application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/Order"}}}},
+            },
+        },
+        "schemas": {
+            "Order": {"type": "object", "properties": {"line": {"$ref": "#/components/schemas/Line"}}},
+            "Line": {"type": "object", "properties": {"sku": {"type": "string"}}},
+            "Unused": {"type": "string"},
+        },
+        "securitySchemes": {"bearer": {"type": "http", "scheme": "bearer"}},
+    },
+}
+
+
+@pytest.fixture
+def index():
+    return SpecIndex(dumps(SPEC))
+
+
+def test_outline_lists_operations_and_tag_counts(index):
+    outline = loads(index.outline)
+    assert outline["info"] == SPEC["info"]
+    assert "components" not in outline
+    assert [(tag["name"], tag["operations"]) for tag in outline["tags"]] == [("orders", 1), ("admin", 1), ("default", 1)]
+    assert [(op["method"], op["path"]) for op in outline["paths"]] == [("get", "/orders"), ("post", "/orders"), ("get", "/health")]
+
+
+def test_tag_slice_keeps_only_its_methods_and_ref_closure(index):
+    sliced, added = index.tag_slice("orders")
+    doc = loads(sliced)
+    assert added == len(sliced)
+    assert list(doc["paths"]["/orders"]) == ["parameters", "get"]
+    assert doc["tags"] == [SPEC["tags"][0]]
+    components = doc["components"]
+    assert set(components["schemas"]) == {"Order", "Line"}
+    assert set(components["parameters"]) == {"Page"}
+    assert set(components["responses"]) == {"OrderList"}
+    assert components["securitySchemes"] == SPEC["components"]["securitySchemes"]
+
+
+def test_path_slice_keeps_every_method(index):
+    doc = loads(index.path_slice("/orders")[0])
+    assert set(doc["paths"]["/orders"]) == {"parameters", "get", "post"}
+    assert "Unused" not in doc["components"]["schemas"]
+
+
+def test_untagged_operations_land_in_default_tag(index):
+    doc = loads(index.tag_slice("default")[0])
+    assert list(doc["paths"]) == ["/health"]
+    assert "schemas" not in doc["components"]
+
+
+def test_unknown_tag_or_path(index):
+    assert index.tag_slice("missing") == (None, 0)
+    assert index.path_slice("/missing") == (None, 0)
+
+
+def test_slices_are_memoized_and_charged_once(index):
+    before = index.size
+    sliced, added = index.tag_slice("admin")
+    assert index.size == before + added
+    again, added_again = index.tag_slice("admin")
+    assert again is sliced
+    assert added_again == 0
+    assert index.size == before + added
+
+
+def test_size_counts_what_the_index_keeps(index):
+    assert not hasattr(index, "_spec")
+    kept = (
+        len(index.outline) + len(index._base) + len(index._security)
+        + sum(map(len, index._tag_docs.values()))
+        + sum(map(len, index._paths.values()))
+        + sum(map(len, index._targets.values()))
+    )
+    assert kept <= index.size < kept + 1024
+
+
+def test_swagger2_definitions_are_sliced():
+    spec = {
+        "swagger": "2.0",
+        "paths": {"/pets": {"get": {"tags": ["pets"], "responses": {"200": {"schema": {"$ref": "#/definitions/Pet"}}}}}},
+        "definitions": {"Pet": {"type": "object"}, "Owner": {"type": "object"}},
+        "securityDefinitions": {"key": {"type": "apiKey", "name": "X-Key", "in": "header"}},
+    }
+    doc = loads(SpecIndex(dumps(spec)).tag_slice("pets")[0])
+    assert doc["definitions"] == {"Pet": {"type": "object"}}
+    assert doc["securityDefinitions"] == spec["securityDefinitions"]
+
+
+def test_rejects_non_object_spec():
+    with pytest.raises(ValueError):
+        SpecIndex(b"[]")
@@ -0,0 +1,115 @@
+import pytest
+
+from database.database import FDSpecBlob, FDSpecSnapshot
+from utils import spec_snapshots
+from utils.json_codec import dumps
+from utils.spec_snapshots import (
+    content_hash,
+    delete_env_snapshots,
+    delete_snapshots,
+    diff_specs,
+    list_snapshots,
+    load_snapshot,
+    prune_orphan_blobs,
+    save_snapshot,
+)
+
+
+V1 = dumps({
+    "info": {"version": "1"},
+    "paths": {"/orders": {"get": {"summary": "list"}}, "/old": {"get": {}}},
+    "components": {"schemas": {"Order": {"type": "object"}}},
+})
+V2 = dumps({
+    "info": {"version": "2"},
+    "paths": {"/orders": {"get": {"summary": "list orders"}, "post": {}}},
+    "components": {"schemas": {"Order": {"type": "object"}, "Line": {"type": "object"}}},
+})
+
+
+@pytest.fixture(autouse=True)
+def forget_saved():
+    spec_snapshots._last_saved.clear()
+    yield
+    spec_snapshots._last_saved.clear()
+
+
+def blob_hashes(db):
+    return {digest for (digest,) in db.query(FDSpecBlob.content_hash)}
+
+
+def test_save_skips_unchanged_content(db):
+    save_snapshot("p1", "prod", V1)
+    spec_snapshots._last_saved.clear()
+    save_snapshot("p1", "prod", V1)
+    save_snapshot("p1", "prod", V2)
+
+    listed = list_snapshots(db, "p1", "prod", 10)
+    assert [s["content_hash"] for s in listed] == [content_hash(V2), content_hash(V1)]
+    assert listed[0]["size"] == len(V2)
+    _, raw = load_snapshot(db, "p1", "prod")
+    assert raw == V2
+    _, raw = load_snapshot(db, "p1", "prod", listed[1]["snapshot_uuid"])
+    assert raw == V1
+
+
+def test_projects_with_the_same_content_share_a_blob(db):
+    save_snapshot("p1", "prod", V1)
+    save_snapshot("p2", "prod", V1)
+    assert db.query(FDSpecSnapshot).count() == 2
+    assert blob_hashes(db) == {content_hash(V1)}
+
+
+def test_prune_keeps_blobs_other_snapshots_still_use(db):
+    save_snapshot("p1", "prod", V1)
+    save_snapshot("p1", "prod", V2)
+    save_snapshot("p2", "prod", V1)
+
+    hashes = delete_snapshots(db, "p1")
+    db.commit()
+    assert hashes == {content_hash(V1), content_hash(V2)}
+    assert prune_orphan_blobs(hashes) == 1
+    assert blob_hashes(db) == {content_hash(V1)}
+
+
+def test_prune_only_looks_at_the_given_hashes(db):
+    save_snapshot("p1", "prod", V1)
+    save_snapshot("p2", "prod", V2)
+    db.query(FDSpecSnapshot).filter(FDSpecSnapshot.project_uuid == "p2").delete()
+    db.commit()
+
+    assert prune_orphan_blobs({content_hash(V1)}) == 0
+    assert blob_hashes(db) == {content_hash(V1), content_hash(V2)}
+
+
+def test_delete_snapshots_for_some_envs(db):
+    save_snapshot("p1", "prod", V1)
+    save_snapshot("p1", "pg", V2)
+
+    assert delete_snapshots(db, "p1", {"pg"}) == {content_hash(V2)}
+    db.commit()
+    assert [s.env for s in db.query(FDSpecSnapshot)] == ["prod"]
+    assert delete_snapshots(db, "p1", {"pg"}) == set()
+
+
+def test_delete_env_snapshots_for_many_projects(db):
+    save_snapshot("p1", "prod", V1)
+    save_snapshot("p1", "pg", V1)
+    save_snapshot("p2", "prod", V2)
+    save_snapshot("p3", "prod", V2)
+
+    hashes = delete_env_snapshots(db, [("p1", ["prod", "pg"]), ("p2", ["prod"])])
+    db.commit()
+    assert hashes == {content_hash(V1), content_hash(V2)}
+    assert [s.project_uuid for s in db.query(FDSpecSnapshot)] == ["p3"]
+    assert delete_env_snapshots(db, []) == set()
+
+
+def test_diff_specs():
+    diff = diff_specs(V1, V2)
+    assert diff["identical"] is False
+    assert diff["info"] == {"from": "1", "to": "2"}
+    assert diff["operations"] == {"added": ["POST /orders"], "removed": ["GET /old"], "changed": ["GET /orders"]}
+    assert diff["schemas"] == {"added": ["Line"], "removed": [], "changed": []}
+    assert diff_specs(V1, V1)["identical"] is True
+    assert diff_specs(b"[]", b"[]") == {"identical": True}
@@ -0,0 +1,176 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from controllers import uploadController
+from controllers.uploadController import (
+    INTERRUPTED,
+    _live_jobs,
+    abandon_upload_job,
+    beat_upload_jobs,
+    fail_stale_upload_jobs,
+    run_upload_job,
+)
+from database.database import FDProjectRegistry, FDTeam, FDUploadJob, IST
+from utils.jobs import JobPool
+
+
+@pytest.fixture(autouse=True)
+def no_live_jobs():
+    _live_jobs.clear()
+    yield
+    _live_jobs.clear()
+
+
+def spool(tmp_path, content=b""):
+    path = tmp_path / f"fd-upload-{uuid.uuid4()}.csv"
+    path.write_bytes(content)
+    return path
+
+
+def add_job(db, path=None, status="queued", idle=0):
+    beat = datetime.now(IST) - timedelta(seconds=idle)
+    job = FDUploadJob(job_id=str(uuid.uuid4()), filename="projects.csv", team_name="Payments", status=status,
+                      created_at=beat, heartbeat_at=beat, spool_path=str(path) if path else None)
+    db.add(job)
+    db.commit()
+    return job.job_id
+
+
+def status(db, job_id):
+    db.expire_all()
+    return db.get(FDUploadJob, job_id).status
+
+
+def test_stale_jobs_fail_and_lose_only_their_files(db, tmp_path):
+    stale = spool(tmp_path)
+    live = spool(tmp_path)
+    held = spool(tmp_path)
+    stale_id = add_job(db, stale, "running", idle=3600)
+    live_id = add_job(db, live, "running")
+    # Held by this process: its heartbeat is only late, the worker is still here.
+    held_id = add_job(db, held, "queued", idle=3600)
+    _live_jobs.add(held_id)
+    done_id = add_job(db, None, "completed", idle=3600)
+
+    fail_stale_upload_jobs()
+
+    assert status(db, stale_id) == "failed"
+    assert db.get(FDUploadJob, stale_id).detail == INTERRUPTED
+    assert not stale.exists()
+    assert status(db, live_id) == "running" and live.exists()
+    assert status(db, held_id) == "queued" and held.exists()
+    assert status(db, done_id) == "completed"
+
+
+def test_heartbeat_disabled_recovers_nothing(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(uploadController, "UPLOAD_JOB_HEARTBEAT_INTERVAL", 0)
+    path = spool(tmp_path)
+    job_id = add_job(db, path, "running", idle=3600)
+
+    fail_stale_upload_jobs()
+
+    assert status(db, job_id) == "running"
+    assert path.exists()
+
+
+def test_beat_refreshes_only_unfinished_jobs(db):
+    running_id = add_job(db, None, "running", idle=3600)
+    done_id = add_job(db, None, "completed", idle=3600)
+
+    beat_upload_jobs([running_id, done_id])
+    fail_stale_upload_jobs()
+
+    db.expire_all()
+    # Stored as naive IST wall time.
+    now = datetime.now(IST).replace(tzinfo=None)
+    assert db.get(FDUploadJob, running_id).heartbeat_at > now - timedelta(minutes=1)
+    assert db.get(FDUploadJob, done_id).heartbeat_at < now - timedelta(minutes=30)
+    assert status(db, running_id) == "running"
+
+
+def test_run_upload_job_records_progress_and_cleans_up(db, tmp_path, monkeypatch):
+    async def valid(urls):
+        return None
+
+    monkeypatch.setattr(uploadController, "validate_project_urls", valid)
+    team_name = f"Jobs-{uuid.uuid4().hex[:8]}"
+    db.add(FDTeam(team_id=str(uuid.uuid4()), team_name=team_name))
+    db.commit()
+    path = spool(tmp_path, (
+        "project-name,production-url,pre-production-url,playground-url\n"
+        "orders,https://orders.example.com,,\n"
+        "billing,,,\n"
+        "ORDERS,https://other.example.com,,\n"
+    ).encode())
+    job_id = add_job(db, path)
+    _live_jobs.add(job_id)
+
+    asyncio.run(run_upload_job(job_id, str(path), "projects.csv", {"team_name": team_name}))
+
+    db.expire_all()
+    job = db.get(FDUploadJob, job_id)
+    assert (job.status, job.processed, job.created, job.updated, job.failed) == ("completed", 3, 1, 0, 2)
+    assert job.started_at is not None and job.finished_at is not None
+    assert '"row": 1' in job.errors and "Duplicate of row 0" in job.errors
+    assert [p.project_name for p in db.query(FDProjectRegistry)] == ["orders"]
+    assert not path.exists()
+    assert job_id not in _live_jobs
+
+
+def test_run_upload_job_fails_on_missing_columns(db, tmp_path):
+    path = spool(tmp_path, b"project-name\norders\n")
+    job_id = add_job(db, path)
+
+    asyncio.run(run_upload_job(job_id, str(path), "projects.csv", {"team_name": "Payments"}))
+
+    db.expire_all()
+    job = db.get(FDUploadJob, job_id)
+    assert job.status == "failed"
+    assert job.detail.startswith("Missing columns: production-url")
+    assert not path.exists()
+
+
+def test_abandon_fails_the_job_and_drops_its_file(db, tmp_path):
+    path = spool(tmp_path)
+    job_id = add_job(db, path)
+    _live_jobs.add(job_id)
+
+    asyncio.run(abandon_upload_job(job_id, str(path)))
+
+    assert status(db, job_id) == "failed"
+    assert not path.exists()
+    assert job_id not in _live_jobs
+
+
+def test_pool_stop_cancels_queued_jobs():
+    ran, cancelled = [], []
+
+    async def scenario():
+        pool = JobPool("test", 1)
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await release.wait()
+
+        async def job(n):
+            ran.append(n)
+
+        async def cancel(n):
+            cancelled.append(n)
+
+        pool.start()
+        pool.submit(slow)
+        pool.submit(lambda: job(1), on_cancel=lambda: cancel(1))
+        pool.submit(lambda: job(2))
+        await started.wait()
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+    assert ran == []
+    assert cancelled == [1]
@@ -0,0 +1,114 @@
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from controllers.uploadController import _insert_projects, _write_rows
+from database.database import engine, FDActivityLog, FDProjectRegistry, FDSpecSnapshot, FDTeam
+from utils import spec_snapshots
+from utils.spec_snapshots import save_snapshot
+
+
+@pytest.fixture
+def team(db):
+    team = FDTeam(team_id=str(uuid.uuid4()), team_name="Payments")
+    db.add(team)
+    db.commit()
+    return team
+
+
+@pytest.fixture
+def statements():
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def row(n, name, team, prod=None, pre_prod=None, pg=None):
+    return {"row": n, "projectname": name, "team_name": team.team_name, "team": team,
+            "prod_url": prod, "pre_prod_url": pre_prod, "pg_url": pg}
+
+
+def add_project(db, team, name, **urls):
+    project = FDProjectRegistry(project_uuid=str(uuid.uuid4()), project_name=name, team_id=team.team_id, **urls)
+    db.add(project)
+    db.commit()
+    return project
+
+
+def test_inserts_and_updates_in_one_batch(db, team):
+    existing = add_project(db, team, "orders", production_url="https://orders.example.com/v1")
+
+    results, invalidated, orphans, failures = _write_rows(db, [
+        row(0, "orders", team, prod="https://orders.example.com/v2"),
+        row(1, "billing", team, pg="https://billing.example.com"),
+    ], "projects.csv")
+    db.commit()
+
+    assert results == ["Updated: orders", "Created: billing"]
+    assert invalidated == [(existing.project_uuid, ["prod_url"])]
+    assert orphans == set()
+    assert failures == []
+    projects = {p.project_name: p for p in db.query(FDProjectRegistry)}
+    assert projects["orders"].production_url == "https://orders.example.com/v2"
+    assert projects["billing"].playground_url == "https://billing.example.com"
+    assert [log.log_message for log in db.query(FDActivityLog)] == ["1 projects added, 1 updated from 'projects.csv'"]
+
+
+def test_unchanged_update_invalidates_nothing(db, team):
+    add_project(db, team, "orders", production_url="https://orders.example.com")
+
+    results, invalidated, _, _ = _write_rows(db, [row(0, "orders", team, prod="https://orders.example.com")], "projects.csv")
+
+    assert results == ["Updated: orders"]
+    assert invalidated == []
+
+
+def test_repeated_key_keeps_the_first_row(db, team):
+    results, _, _, _ = _write_rows(db, [
+        row(0, "Orders", team, prod="https://first.example.com"),
+        row(1, "orders", team, prod="https://second.example.com"),
+    ], "projects.csv")
+    db.commit()
+
+    assert results == ["Created: Orders"]
+    assert [(p.project_name, p.production_url) for p in db.query(FDProjectRegistry)] == [("Orders", "https://first.example.com")]
+
+
+def test_changed_urls_drop_snapshots_with_one_delete(db, team, statements):
+    spec_snapshots._last_saved.clear()
+    projects = [add_project(db, team, name, production_url=f"https://{name}.example.com") for name in ("a", "b", "c")]
+    for project in projects:
+        save_snapshot(project.project_uuid, "prod_url", project.project_name.encode())
+    statements.clear()
+
+    _, invalidated, orphans, _ = _write_rows(db, [
+        row(n, p.project_name, team, prod=f"https://{p.project_name}.example.org") for n, p in enumerate(projects)
+    ], "projects.csv")
+    db.commit()
+
+    assert len(invalidated) == 3
+    assert len(orphans) == 3
+    assert db.query(FDSpecSnapshot).count() == 0
+    snapshot_deletes = [s for s in statements if s.startswith("DELETE FROM fd_spec_snapshot")]
+    assert len(snapshot_deletes) == 1
+
+
+def test_conflicting_insert_only_fails_its_row(db, team):
+    add_project(db, team, "orders")
+    inserts = [
+        (row(0, "orders", team), {"project_uuid": str(uuid.uuid4()), "project_name": "orders", "team_id": team.team_id}),
+        (row(1, "billing", team), {"project_uuid": str(uuid.uuid4()), "project_name": "billing", "team_id": team.team_id}),
+    ]
+
+    inserted, failures = _insert_projects(db, inserts)
+    db.commit()
+
+    assert [project["projectname"] for project, _ in inserted] == ["billing"]
+    assert failures == [{"row": 0, "error": "Project 'orders' already exists in team 'Payments'"}]
+    assert sorted(p.project_name for p in db.query(FDProjectRegistry)) == ["billing", "orders"]
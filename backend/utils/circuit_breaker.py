@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+import httpx
+
+from utils.http_client import url_host
+
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Circuit open for upstream {host}, retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after consecutive failures, then lets a few probes through."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.latencies = deque(maxlen=200)
+
+    def before_request(self):
+        if self.state == OPEN:
+            waited = time.monotonic() - self.opened_at
+            if waited < BREAKER_RESET_TIMEOUT:
+                raise CircuitOpenError(self.host, BREAKER_RESET_TIMEOUT - waited)
+            self.state = HALF_OPEN
+            self.probes_in_flight = 0
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= BREAKER_HALF_OPEN_PROBES:
+                raise CircuitOpenError(self.host, BREAKER_RESET_TIMEOUT)
+            self.probes_in_flight += 1
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.failures = 0
+        self.state = CLOSED
+        self.probes_in_flight = 0
+
+    def release_probe(self):
+        """Give back a probe slot whose request ended without saying anything about the host."""
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= BREAKER_FAILURE_THRESHOLD:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.probes_in_flight = 0
+
+    def hedge_delay(self):
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE))
+        return max(ordered[index], HEDGE_MIN_DELAY)
+
+
+_breakers = {}
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    host = url_host(url)
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host)
+    return breaker
+
+
+def is_upstream_failure(response: httpx.Response) -> bool:
+    return response.status_code >= 500
+
+
+def is_gateway_failure(response: httpx.Response) -> bool:
+    """Only statuses that say the host itself is unavailable; an application 500 is a normal answer."""
+    return response.status_code in (502, 503, 504)
+
+
+async def guarded(url: str, send, is_failure=is_upstream_failure):
+    """Run send() (a coroutine factory returning an httpx.Response) through the host's breaker.
+
+    Connection errors, timeouts, responses matching is_failure (any 5xx by
+    default) and any other exception from send or is_failure count as
+    failures. A cancelled request only gives its half-open probe slot back,
+    so no exit path can leave the breaker waiting on a probe forever.
+    """
+    breaker = get_breaker(url)
+    breaker.before_request()
+    started = time.monotonic()
+    try:
+        response = await send()
+        failed = is_failure(response)
+    except Exception:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release_probe()
+        raise
+    if failed:
+        breaker.record_failure()
+    else:
+        breaker.record_success(time.monotonic() - started)
+    return response
+
+
+async def hedged_get(client, url: str, headers=None):
+    """GET url through the breaker, sending one backup request if the first is slower than the host's pN latency."""
+    breaker = get_breaker(url)
+    delay = breaker.hedge_delay() if HEDGE_ENABLED else None
+    if delay is None:
+        return await guarded(url, lambda: client.get(url, headers=headers))
+
+    primary = asyncio.create_task(guarded(url, lambda: client.get(url, headers=headers)))
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+
+        tasks.add(asyncio.create_task(guarded(url, lambda: client.get(url, headers=headers))))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        # Both attempts failed; surface the primary's error.
+        return primary.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import os
+import struct
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str, allowed=None):
+    """Pick the best encoding we can produce from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    for encoding in allowed or supported_encodings():
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+# Not an HTTP encoding: a cacheable piece of a gzip stream, see gzip_from_segments.
+DEFLATE_SEGMENT = "deflate-segment"
+# Final empty deflate block that closes a stream made of sync-flushed segments.
+_DEFLATE_END = b"\x03\x00"
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    if encoding == DEFLATE_SEGMENT:
+        return deflate_segment(data)
+    return data
+
+
+def deflate_segment(data: bytes) -> bytes:
+    """Raw deflate of data, sync-flushed and not final, so segments can be concatenated."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+async def gzip_from_segments(parts):
+    """Assemble one gzip stream from (data, segment) pairs.
+
+    segment is deflate_segment(data), typically cached, or None to deflate
+    data here. Only the CRC is computed per request, which is far cheaper
+    than compressing again.
+    """
+    yield _GZIP_HEADER
+    crc, size = 0, 0
+    async for data, segment in parts:
+        if len(data) >= COMPRESSION_MIN_SIZE:
+            crc = await asyncio.to_thread(zlib.crc32, data, crc)
+        else:
+            crc = zlib.crc32(data, crc)
+        size += len(data)
+        yield segment if segment is not None else deflate_segment(data)
+    yield _DEFLATE_END + struct.pack("<II", crc, size & 0xFFFFFFFF)
+
+
+class StreamCompressor:
+    """Incremental compressor for responses that are produced chunk by chunk."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+async def compress_stream(chunks, encoding: str):
+    """Compress an async byte stream; the work runs in a thread so large chunks don't block the loop."""
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        yield await asyncio.to_thread(compressor.compress, chunk)
+    yield await asyncio.to_thread(compressor.finish)
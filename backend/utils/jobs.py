@@ -0,0 +1,55 @@
+import asyncio
+import os
+
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+
+
+class JobPool:
+    """Fixed number of asyncio workers draining a queue of job coroutine factories.
+
+    Jobs still queued at stop() are not run; their on_cancel coroutine
+    factory (if any) is awaited instead so they can release what they hold.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self._queue = asyncio.Queue()
+        self._workers = []
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.size)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            _, on_cancel = self._queue.get_nowait()
+            if on_cancel is not None:
+                try:
+                    await on_cancel()
+                except Exception as e:
+                    print(f"{self.name} job cancellation failed: {e}")
+
+    def submit(self, job, on_cancel=None):
+        self._queue.put_nowait((job, on_cancel))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def _work(self):
+        while True:
+            job, _ = await self._queue.get()
+            try:
+                await job()
+            except Exception as e:
+                print(f"{self.name} job failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+upload_pool = JobPool("upload", UPLOAD_WORKERS)
@@ -0,0 +1,48 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def normalize_json_bytes(data: bytes, charset: str = None):
+    """Return upstream JSON as single-line UTF-8 bytes, or None if it is not valid JSON.
+
+    The document is validated once and its bytes are kept as-is, so it can be
+    embedded in a response without being parsed into Python objects again.
+    """
+    if charset and charset.lower().replace("_", "-") not in ("utf-8", "utf8", "ascii", "us-ascii"):
+        try:
+            data = data.decode(charset).encode("utf-8")
+        except (LookupError, UnicodeDecodeError):
+            return None
+    if data.startswith(b"\xef\xbb\xbf"):
+        data = data[3:]
+    data = data.strip()
+    try:
+        loads(data)
+    except ValueError:
+        return None
+    # Raw CR/LF can only be insignificant whitespace in valid JSON.
+    if b"\n" in data or b"\r" in data:
+        data = data.replace(b"\r", b" ").replace(b"\n", b" ")
+    return data
+
+
+def envelope(projectname, raw_spec: bytes, id) -> bytes:
+    """Build {"service", "swagger", "id"} around already-encoded spec bytes."""
+    swagger = raw_spec if raw_spec is not None else b"null"
+    return b'{"service":' + dumps(projectname) + b',"swagger":' + swagger + b',"id":' + dumps(id) + b"}"
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import threading
+
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal, FDActivityLog, FDTeam
+from utils.registry_versions import registry_versions
+from utils.periodic import PeriodicTask
+
+
+MAX_LOGS_PER_TEAM = int(os.getenv("MAX_LOGS_PER_TEAM", "30"))
+if MAX_LOGS_PER_TEAM < 1:
+    # trim_team_logs keeps the newest MAX_LOGS_PER_TEAM rows; 0 or less has no cutoff row.
+    raise ValueError(f"MAX_LOGS_PER_TEAM must be at least 1, got {MAX_LOGS_PER_TEAM}")
+LOG_COMPACTION_INTERVAL = float(os.getenv("LOG_COMPACTION_INTERVAL", "60"))
+# Without the background compactor, trim inline once every this many writes per team.
+LOG_TRIM_EVERY = int(os.getenv("LOG_TRIM_EVERY", "20"))
+
+# Teams that got new log rows since they were last trimmed, with the write count.
+_dirty = {}
+# enforce_log_limit runs on threadpool threads; the compactor swaps _dirty out under this lock.
+_dirty_lock = threading.Lock()
+
+
+def trim_team_logs(db: Session, team_id: str, max_logs: int = MAX_LOGS_PER_TEAM) -> int:
+    """Delete everything older than the team's max_logs newest entries.
+
+    One index lookup on (team_id, log_timestamp) for the cutoff and one
+    bounded DELETE; nothing is loaded into the session.
+    """
+    cutoff = (
+        db.query(FDActivityLog.log_timestamp)
+        .filter(FDActivityLog.team_id == team_id)
+        .order_by(FDActivityLog.log_timestamp.desc())
+        .offset(max_logs - 1)
+        .limit(1)
+        .scalar()
+    )
+    if cutoff is None:
+        return 0
+    return (
+        db.query(FDActivityLog)
+        .filter(FDActivityLog.team_id == team_id, FDActivityLog.log_timestamp < cutoff)
+        .delete(synchronize_session=False)
+    )
+
+
+def enforce_log_limit(db: Session, team_id: str):
+    """Note a new log row for team_id; constant time on the write path.
+
+    The compactor trims dirty teams in the background. When it is not
+    running, every LOG_TRIM_EVERY-th write for a team trims inline.
+    """
+    with _dirty_lock:
+        writes = _dirty[team_id] = _dirty.get(team_id, 0) + 1
+        trim = not log_compactor.running and writes >= LOG_TRIM_EVERY
+        if trim:
+            del _dirty[team_id]
+    if trim:
+        trim_team_logs(db, team_id)
+
+
+def compact_logs(team_ids):
+    db = SessionLocal()
+    try:
+        removed = 0
+        for team_id in team_ids:
+            trimmed = trim_team_logs(db, team_id)
+            db.commit()
+            if trimmed:
+                registry_versions.bump(team_id)
+            removed += trimmed
+        return removed
+    finally:
+        db.close()
+
+
+def _mark_dirty(team_ids):
+    with _dirty_lock:
+        for team_id in team_ids:
+            _dirty.setdefault(team_id, 0)
+
+
+def _take_dirty():
+    global _dirty
+    with _dirty_lock:
+        taken, _dirty = _dirty, {}
+    return list(taken)
+
+
+def _all_team_ids():
+    db = SessionLocal()
+    try:
+        return [team_id for (team_id,) in db.query(FDTeam.team_id).all()]
+    finally:
+        db.close()
+
+
+async def _compact_dirty():
+    team_ids = _take_dirty()
+    if team_ids:
+        try:
+            await asyncio.to_thread(compact_logs, team_ids)
+        except Exception:
+            _mark_dirty(team_ids)
+            raise
+
+
+log_compactor = PeriodicTask("Activity log compaction", LOG_COMPACTION_INTERVAL, _compact_dirty)
+
+
+async def start_log_compactor():
+    if LOG_COMPACTION_INTERVAL > 0 and not log_compactor.running:
+        # Logs written before this process started may be over the cap.
+        try:
+            _mark_dirty(await asyncio.to_thread(_all_team_ids))
+        except Exception as e:
+            print(f"Activity log compaction could not list teams: {e}")
+    log_compactor.start()
+
+
+async def stop_log_compactor():
+    await log_compactor.stop()
@@ -0,0 +1,40 @@
+import asyncio
+
+
+class PeriodicTask:
+    """Runs the coroutine function run every interval seconds in one background task.
+
+    A failed run is logged and retried on the next tick. interval <= 0
+    disables the task; with delay_first the first run waits one interval.
+    """
+
+    def __init__(self, name: str, interval: float, run, delay_first: bool = False):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.delay_first = delay_first
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        if self.delay_first:
+            await asyncio.sleep(self.interval)
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                print(f"{self.name} failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import threading
+from bisect import bisect_left, insort
+
+from database.database import SessionLocal, FDProjectRegistry, FDTeam, ENV_COLUMNS
+from utils.http_client import url_hostname
+from utils.periodic import PeriodicTask
+
+
+# Other workers' project changes become searchable after this many seconds; 0 disables the refresh.
+PROJECT_SEARCH_REFRESH_INTERVAL = float(os.getenv("PROJECT_SEARCH_REFRESH_INTERVAL", "300"))
+
+SEARCH_FIELDS = ("name", "team", "host")
+URL_FIELDS = tuple(ENV_COLUMNS)
+# Match kinds, best first.
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+
+def _trigrams(term: str):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def _project_terms(project: dict):
+    terms = {("name", project["projectname"].lower()), ("team", project["team_name"].lower())}
+    for field in URL_FIELDS:
+        host = url_hostname(project.get(field))
+        if host:
+            terms.add(("host", host))
+    return terms
+
+
+class ProjectSearchIndex:
+    """In-memory search over project names, team names and URL hosts.
+
+    Every distinct term is kept in a sorted list for prefix lookups and in a
+    trigram map for substring lookups, so a search touches only the terms
+    that can match. Projects are the API dicts returned by the project
+    endpoints (uuid, projectname, team_name, prod_url, pre_prod_url, pg_url).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._projects = {}
+        self._project_terms = {}
+        self._postings = {}
+        self._sorted_terms = []
+        self._grams = {}
+        self.loaded = False
+
+    def load(self):
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(
+                    FDProjectRegistry.project_uuid,
+                    FDProjectRegistry.project_name,
+                    FDTeam.team_name,
+                    *(getattr(FDProjectRegistry, column) for column in ENV_COLUMNS.values()),
+                )
+                .join(FDTeam, FDTeam.team_id == FDProjectRegistry.team_id)
+                .all()
+            )
+        finally:
+            db.close()
+        fresh = ProjectSearchIndex()
+        for row in rows:
+            fresh._add(dict(zip(("uuid", "projectname", "team_name", *URL_FIELDS), row)))
+        with self._lock:
+            self._projects = fresh._projects
+            self._project_terms = fresh._project_terms
+            self._postings = fresh._postings
+            self._sorted_terms = fresh._sorted_terms
+            self._grams = fresh._grams
+            self.loaded = True
+
+    def upsert(self, project: dict):
+        with self._lock:
+            self._remove(project["uuid"])
+            self._add(project)
+
+    def remove(self, project_uuid: str):
+        with self._lock:
+            self._remove(project_uuid)
+
+    def _add(self, project: dict):
+        project_uuid = project["uuid"]
+        terms = _project_terms(project)
+        self._projects[project_uuid] = {key: project.get(key) for key in ("uuid", "projectname", "team_name", *URL_FIELDS)}
+        self._project_terms[project_uuid] = terms
+        for key in terms:
+            postings = self._postings.get(key)
+            if postings is None:
+                postings = self._postings[key] = set()
+                field, term = key
+                insort(self._sorted_terms, (term, field))
+                for gram in _trigrams(term):
+                    self._grams.setdefault(gram, set()).add(key)
+            postings.add(project_uuid)
+
+    def _remove(self, project_uuid: str):
+        self._projects.pop(project_uuid, None)
+        for key in self._project_terms.pop(project_uuid, ()):
+            postings = self._postings[key]
+            postings.discard(project_uuid)
+            if postings:
+                continue
+            del self._postings[key]
+            field, term = key
+            index = bisect_left(self._sorted_terms, (term, field))
+            del self._sorted_terms[index]
+            for gram in _trigrams(term):
+                keys = self._grams[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def _matching_terms(self, query: str):
+        """{(field, term): match kind} for every indexed term containing query."""
+        matches = {}
+        index = bisect_left(self._sorted_terms, (query, ""))
+        while index < len(self._sorted_terms) and self._sorted_terms[index][0].startswith(query):
+            term, field = self._sorted_terms[index]
+            matches[(field, term)] = EXACT if term == query else PREFIX
+            index += 1
+        # Substrings need at least one full trigram; shorter queries only match as prefixes.
+        grams = sorted((self._grams.get(gram, ()) for gram in _trigrams(query)), key=len)
+        if grams:
+            for key in set(grams[0]).intersection(*grams[1:]):
+                if key not in matches and query in key[1]:
+                    matches[key] = SUBSTRING
+        return matches
+
+    def search(self, query: str, fields=SEARCH_FIELDS, team_name: str = None, limit: int = 20) -> dict:
+        query = query.strip().lower()
+        team_name = team_name.lower() if team_name else None
+        with self._lock:
+            best = {}
+            for (field, term), kind in self._matching_terms(query).items():
+                if field not in fields:
+                    continue
+                for project_uuid in self._postings[(field, term)]:
+                    found = best.setdefault(project_uuid, [kind, set()])
+                    found[0] = min(found[0], kind)
+                    found[1].add(field)
+            hits = [
+                (kind, self._projects[project_uuid], matched)
+                for project_uuid, (kind, matched) in best.items()
+                if team_name is None or self._projects[project_uuid]["team_name"].lower() == team_name
+            ]
+        hits.sort(key=lambda hit: (hit[0], hit[1]["projectname"].lower(), hit[1]["team_name"].lower()))
+        return {
+            "total": len(hits),
+            "items": [
+                {**project, "matched": sorted(matched, key=SEARCH_FIELDS.index)}
+                for _, project, matched in hits[:limit]
+            ],
+        }
+
+
+project_search = ProjectSearchIndex()
+
+
+async def ensure_search_loaded():
+    if not project_search.loaded:
+        await asyncio.to_thread(project_search.load)
+
+
+async def _reload():
+    await asyncio.to_thread(project_search.load)
+
+
+search_refresher = PeriodicTask("Project search refresh", PROJECT_SEARCH_REFRESH_INTERVAL, _reload, delay_first=True)
+
+
+async def start_project_search():
+    try:
+        await asyncio.to_thread(project_search.load)
+    except Exception as e:
+        print(f"Project search load failed, building on first search: {e}")
+    search_refresher.start()
+
+
+async def stop_project_search():
+    await search_refresher.stop()
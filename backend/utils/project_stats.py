@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import func
+
+from database.database import SessionLocal, FDProjectRegistry, FDTeam, ENV_COLUMNS
+from utils.periodic import PeriodicTask
+
+
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "300"))
+# Change counts are kept per worker process, see ProjectStats.
+CHANGE_WINDOWS = {"last_hour": 3600, "last_24h": 86400}
+
+
+def env_presence(project):
+    """{env field: has URL} for an FDProjectRegistry row or a dict of column values."""
+    get = project.get if isinstance(project, dict) else lambda column: getattr(project, column)
+    return {field: bool(get(column)) for field, column in ENV_COLUMNS.items()}
+
+
+def _empty_counts():
+    return {"projects": 0, **{field: 0 for field in ENV_COLUMNS}}
+
+
+class ProjectStats:
+    """Per-team project and environment counts, updated on every committed write.
+
+    The counters are reconciled against the database every
+    STATS_RECONCILE_INTERVAL seconds, which also corrects drift from writes
+    made by other worker processes.
+
+    The created/updated/deleted rates under "changes" are per worker: they
+    count the writes this process committed and are not reconciled, because
+    nothing in the database records them (activity logs are capped per team
+    and bulk uploads log one line per batch). With several workers each
+    answer covers only the worker that served it; snapshot() reports this
+    as "changes_scope".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._teams = {}
+        self._names = {}
+        self._events = deque()
+        self.loaded = False
+
+    def reconcile(self):
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(
+                    FDTeam.team_id,
+                    FDTeam.team_name,
+                    func.count(FDProjectRegistry.project_uuid),
+                    *(func.count(getattr(FDProjectRegistry, column)) for column in ENV_COLUMNS.values()),
+                )
+                .outerjoin(FDProjectRegistry, FDProjectRegistry.team_id == FDTeam.team_id)
+                .group_by(FDTeam.team_id, FDTeam.team_name)
+                .all()
+            )
+        finally:
+            db.close()
+        teams, names = {}, {}
+        for team_id, team_name, projects, *envs in rows:
+            teams[team_id] = {"projects": projects, **dict(zip(ENV_COLUMNS, envs))}
+            names[team_id] = team_name
+        with self._lock:
+            self._teams, self._names = teams, names
+            self.loaded = True
+
+    def add_team(self, team_id: str, team_name: str):
+        with self._lock:
+            self._names[team_id] = team_name
+            self._teams.setdefault(team_id, _empty_counts())
+
+    def apply(self, team_id: str, old: dict = None, new: dict = None, count: int = 1):
+        """Record one change: old/new are env_presence() dicts, None for a missing project."""
+        kind = "created" if old is None else "deleted" if new is None else "updated"
+        with self._lock:
+            counts = self._teams.setdefault(team_id, _empty_counts())
+            counts["projects"] += count * ((new is not None) - (old is not None))
+            for field in ENV_COLUMNS:
+                counts[field] += count * (bool(new and new[field]) - bool(old and old[field]))
+            self._events.append((time.monotonic(), team_id, kind, count))
+            self._prune()
+
+    def _prune(self):
+        horizon = time.monotonic() - max(CHANGE_WINDOWS.values())
+        while self._events and self._events[0][0] < horizon:
+            self._events.popleft()
+
+    def snapshot(self, team_id: str = None) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self._prune()
+            team_ids = [team_id] if team_id is not None else list(self._teams)
+            totals = _empty_counts()
+            for tid in team_ids:
+                for key, value in self._teams.get(tid, {}).items():
+                    totals[key] += value
+            changes = {
+                window: {kind: 0 for kind in ("created", "updated", "deleted")}
+                for window in CHANGE_WINDOWS
+            }
+            for at, tid, kind, count in self._events:
+                if team_id is None or tid == team_id:
+                    for window, seconds in CHANGE_WINDOWS.items():
+                        if now - at <= seconds:
+                            changes[window][kind] += count
+            result = {
+                "registered_projects": totals["projects"],
+                "environments": {field: totals[field] for field in ENV_COLUMNS},
+                "changes": changes,
+                "changes_scope": "worker",
+            }
+            if team_id is None:
+                result["teams"] = sorted(
+                    (
+                        {
+                            "team_name": self._names.get(tid),
+                            "registered_projects": counts["projects"],
+                            "environments": {field: counts[field] for field in ENV_COLUMNS},
+                        } for tid, counts in self._teams.items()
+                    ),
+                    key=lambda team: (-team["registered_projects"], team["team_name"] or ""),
+                )
+        return result
+
+
+project_stats = ProjectStats()
+
+
+async def ensure_stats_loaded():
+    if not project_stats.loaded:
+        await asyncio.to_thread(project_stats.reconcile)
+
+
+async def _reconcile():
+    await asyncio.to_thread(project_stats.reconcile)
+
+
+stats_reconciler = PeriodicTask("Statistics reconciliation", STATS_RECONCILE_INTERVAL, _reconcile)
+
+
+def start_stats_reconciler():
+    stats_reconciler.start()
+
+
+async def stop_stats_reconciler():
+    await stats_reconciler.stop()
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+import uuid
+import zlib
+
+
+# ETags also roll over every this many seconds, which bounds how long another
+# worker's writes (and the statistics' time windows) can be answered with a 304.
+REGISTRY_ETAG_MAX_AGE = int(os.getenv("REGISTRY_ETAG_MAX_AGE", "60"))
+
+# Counters restart at zero with the process; the boot id keeps old ETags from matching.
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class RegistryVersions:
+    """Per-team change counters for the registry, plus one across all teams.
+
+    Writes bump the teams they touched once their transaction commits; the
+    read endpoints derive their ETags from the counters, so a revalidation
+    can be answered without touching the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._teams = {}
+        self._all = 0
+
+    def bump(self, *team_ids):
+        with self._lock:
+            self._all += 1
+            for team_id in set(team_ids):
+                if team_id:
+                    self._teams[team_id] = self._teams.get(team_id, 0) + 1
+
+    def version(self, team_id: str = None) -> int:
+        return self._all if team_id is None else self._teams.get(team_id, 0)
+
+    def etag(self, team_id: str, variant: str) -> str:
+        """Weak ETag for one representation (variant) of team_id's data; None means all teams."""
+        bucket = int(time.time() // REGISTRY_ETAG_MAX_AGE) if REGISTRY_ETAG_MAX_AGE > 0 else 0
+        key = zlib.crc32(f"{team_id or '*'}|{variant}".encode())
+        return f'W/"{BOOT_ID}-{self.version(team_id)}-{bucket}-{key:08x}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison.
+    strip = lambda tag: tag.strip().removeprefix("W/")
+    return strip(etag) in {strip(tag) for tag in if_none_match.split(",")}
+
+
+registry_versions = RegistryVersions()
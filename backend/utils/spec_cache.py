@@ -0,0 +1,111 @@
+import os
+import time
+from collections import OrderedDict
+
+
+SPEC_CACHE_TTL = float(os.getenv("SPEC_CACHE_TTL", "300"))
+SPEC_CACHE_MAX_BYTES = int(os.getenv("SPEC_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class SpecCacheEntry:
+    __slots__ = ("url", "raw", "size", "etag", "last_modified", "fetched_at", "variants", "index")
+
+    def __init__(self, url, raw: bytes, etag=None, last_modified=None):
+        self.url = url
+        # Validated, single-line UTF-8 JSON exactly as served by the upstream.
+        self.raw = raw
+        self.size = len(raw)
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        # Serialized / pre-compressed response bodies for this spec version.
+        self.variants = {}
+        # Outline / slice index (utils.spec_slicer.SpecIndex), built on first use; slices grow it lazily.
+        self.index = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def validator_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class SpecCache:
+    """LRU cache of fetched specs keyed by (project_uuid, env), bounded by total bytes.
+
+    Entries outlive their TTL so that a stale copy can still be revalidated
+    with its ETag / Last-Modified instead of being downloaded again.
+    """
+
+    def __init__(self, ttl: float = SPEC_CACHE_TTL, max_bytes: int = SPEC_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry: SpecCacheEntry) -> bool:
+        return entry.age() < self.ttl
+
+    def put(self, key, entry: SpecCacheEntry):
+        self.invalidate(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+
+    def add_variant(self, key, entry: SpecCacheEntry, variant_key, body: bytes):
+        entry.variants[variant_key] = body
+        self._grow(key, entry, len(body))
+
+    def attach_index(self, key, entry: SpecCacheEntry, index):
+        entry.index = index
+        self._grow(key, entry, index.size)
+
+    def grow_index(self, key, entry: SpecCacheEntry, size: int):
+        """Account for slices built lazily on entry's index."""
+        if size:
+            self._grow(key, entry, size)
+
+    def _grow(self, key, entry: SpecCacheEntry, size: int):
+        if self._entries.get(key) is entry:
+            entry.size += size
+            self.total_bytes += size
+            # An entry that outgrew the whole cache is dropped rather than kept at everyone else's expense.
+            if entry.size > self.max_bytes:
+                self.invalidate(key)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+
+    def touch(self, key):
+        entry = self.get(key)
+        if entry is not None:
+            entry.fetched_at = time.monotonic()
+        return entry
+
+    def invalidate(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def invalidate_project(self, project_uuid: str, envs=None):
+        for key in [k for k in self._entries if k[0] == project_uuid]:
+            if envs is None or key[1] in envs:
+                self.invalidate(key)
+
+
+spec_cache = SpecCache()
@@ -0,0 +1,138 @@
+import asyncio
+import os
+
+from database.database import SessionLocal, FDProjectRegistry, ENV_COLUMNS
+from utils.http_client import get_http_client, host_limit
+from utils.spec_cache import spec_cache, SpecCacheEntry
+from utils.circuit_breaker import hedged_get
+from utils.json_codec import normalize_json_bytes
+from utils.spec_snapshots import schedule_snapshot, load_latest_raw
+from utils.periodic import PeriodicTask
+
+
+SPEC_REFRESH_INTERVAL = float(os.getenv("SPEC_REFRESH_INTERVAL", "300"))
+SPEC_REFRESH_CONCURRENCY = int(os.getenv("SPEC_REFRESH_CONCURRENCY", "10"))
+# A cached copy older than this is revalidated inline instead of being served stale.
+SPEC_MAX_STALE = float(os.getenv("SPEC_MAX_STALE", "86400"))
+
+_inflight = {}
+
+
+class UpstreamStatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"Upstream responded with status {status_code}")
+        self.status_code = status_code
+
+
+async def refresh_spec(client, key, url):
+    """Fetch or revalidate one spec and store it in the cache.
+
+    Returns the cache entry, or None when the upstream body is not JSON.
+    Raises httpx.RequestError, CircuitOpenError or UpstreamStatusError on failure.
+    """
+    entry = spec_cache.get(key)
+    if entry is not None and entry.url != url:
+        spec_cache.invalidate(key)
+        entry = None
+
+    async with host_limit(url):
+        response = await hedged_get(client, url, headers=entry.validator_headers() if entry else None)
+
+    if response.status_code == 304 and entry is not None:
+        return spec_cache.touch(key)
+    if response.status_code != 200:
+        raise UpstreamStatusError(response.status_code)
+    raw = normalize_json_bytes(response.content, response.charset_encoding)
+    if raw is None:
+        return None
+
+    entry = SpecCacheEntry(
+        url,
+        raw,
+        etag=response.headers.get("etag"),
+        last_modified=response.headers.get("last-modified"),
+    )
+    spec_cache.put(key, entry)
+    schedule_snapshot(key[0], key[1], raw)
+    return entry
+
+
+async def load_snapshot_entry(key, url):
+    """Put the latest stored snapshot for key in the cache as a stale copy, if there is one."""
+    try:
+        raw = await asyncio.to_thread(load_latest_raw, key[0], key[1])
+    except Exception as e:
+        print(f"Failed to load spec snapshot for {key}: {e}")
+        return None
+    if raw is None:
+        return None
+    entry = SpecCacheEntry(url, raw)
+    # Marked stale so the next request schedules a refresh against the upstream.
+    entry.fetched_at -= spec_cache.ttl
+    spec_cache.put(key, entry)
+    return entry
+
+
+def is_servable(entry) -> bool:
+    return entry is not None and entry.age() < SPEC_MAX_STALE
+
+
+async def _refresh_quietly(client, key, url):
+    try:
+        await refresh_spec(client, key, url)
+    except Exception as e:
+        # Keep serving the last good copy; the next cycle will try again.
+        print(f"Background refresh failed for {key} from {url}: {e}")
+
+
+def schedule_refresh(key, url):
+    """Start a background refresh for key unless one is already running."""
+    task = _inflight.get(key)
+    if task is not None and not task.done():
+        return task
+    task = asyncio.create_task(_refresh_quietly(get_http_client(), key, url))
+    _inflight[key] = task
+    task.add_done_callback(lambda t: _inflight.pop(key, None) if _inflight.get(key) is t else None)
+    return task
+
+
+def _load_spec_targets():
+    db = SessionLocal()
+    try:
+        projects = db.query(FDProjectRegistry).all()
+        return [
+            ((project.project_uuid, env), getattr(project, column))
+            for project in projects
+            for env, column in ENV_COLUMNS.items()
+            if getattr(project, column)
+        ]
+    finally:
+        db.close()
+
+
+async def refresh_all_specs():
+    targets = await asyncio.to_thread(_load_spec_targets)
+    client = get_http_client()
+    semaphore = asyncio.Semaphore(SPEC_REFRESH_CONCURRENCY)
+
+    async def refresh_one(key, url):
+        async with semaphore:
+            await _refresh_quietly(client, key, url)
+
+    await asyncio.gather(*(refresh_one(key, url) for key, url in targets))
+
+
+spec_refresher = PeriodicTask("Spec refresh cycle", SPEC_REFRESH_INTERVAL, refresh_all_specs)
+
+
+def start_spec_refresher():
+    spec_refresher.start()
+
+
+async def stop_spec_refresher():
+    await spec_refresher.stop()
+    tasks = list(_inflight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _inflight.clear()
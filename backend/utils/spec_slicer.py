@@ -0,0 +1,203 @@
+import threading
+
+from utils.json_codec import dumps, loads
+
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+# Top-level keys that hold reusable definitions; slices only keep what they reference.
+REUSABLE_KEYS = ("components", "definitions", "parameters", "responses", "securityDefinitions")
+DEFAULT_TAG = "default"
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _pointer_parts(ref: str):
+    return [_unescape(part) for part in ref[2:].split("/")] if ref.startswith("#/") else None
+
+
+def _resolve(doc, parts):
+    node = doc
+    for part in parts:
+        if isinstance(node, dict) and part in node:
+            node = node[part]
+        elif isinstance(node, list) and part.isdigit() and int(part) < len(node):
+            node = node[int(part)]
+        else:
+            return None
+    return node
+
+
+def _collect_refs(node, refs: set):
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            ref = current.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/"):
+                refs.add(ref)
+            stack.extend(current.values())
+        elif isinstance(current, list):
+            stack.extend(current)
+
+
+class SpecIndex:
+    """Outline and per-tag / per-path slices of one OpenAPI (or Swagger 2) document.
+
+    Only the outline and the $ref graph are built up front. A tag or path
+    slice is built the first time it is requested and kept; every slice is
+    a standalone document that carries the $ref targets it needs, so it can
+    be rendered on its own.
+
+    The parsed document is dropped once the index is built: slices are put
+    together from encoded path items and $ref targets, and size counts
+    those bytes, not the several-times-larger parsed tree.
+    """
+
+    def __init__(self, raw: bytes):
+        spec = loads(raw)
+        if not isinstance(spec, dict):
+            raise ValueError("Spec is not a JSON object")
+        self._lock = threading.Lock()
+        self._base = dumps({key: value for key, value in spec.items() if key not in ("paths", "tags", *REUSABLE_KEYS)})
+        # securitySchemes and securityDefinitions are looked up by name, not $ref, so slices always keep them.
+        security = {}
+        if (spec.get("components") or {}).get("securitySchemes") is not None:
+            security["components"] = {"securitySchemes": spec["components"]["securitySchemes"]}
+        if "securityDefinitions" in spec:
+            security["securityDefinitions"] = spec["securityDefinitions"]
+        self._security = dumps(security)
+        tag_docs = {tag.get("name"): tag for tag in spec.get("tags") or [] if isinstance(tag, dict)}
+        self._tag_docs = {name: dumps(tag) for name, tag in tag_docs.items()}
+
+        self._tag_paths = {}
+        operations = []
+        paths = {path: item for path, item in (spec.get("paths") or {}).items() if isinstance(item, dict)}
+        for path, item in paths.items():
+            for method in HTTP_METHODS:
+                operation = item.get(method)
+                if not isinstance(operation, dict):
+                    continue
+                tags = operation.get("tags") or [DEFAULT_TAG]
+                operations.append({
+                    "path": path,
+                    "method": method,
+                    "operationId": operation.get("operationId"),
+                    "summary": operation.get("summary"),
+                    "tags": tags,
+                    "deprecated": operation.get("deprecated", False),
+                })
+                for tag in tags:
+                    self._tag_paths.setdefault(tag, {}).setdefault(path, []).append(method)
+
+        self.outline = dumps({
+            **{key: value for key, value in spec.items() if key not in ("paths", "tags", *REUSABLE_KEYS)},
+            "tags": [
+                {**tag_docs.get(tag, {"name": tag}), "operations": sum(len(m) for m in self._tag_paths[tag].values())}
+                for tag in self._ordered_tags(self._tag_paths)
+            ],
+            "paths": operations,
+        })
+        # $ref -> the refs its target uses directly; slices walk this graph for their closure.
+        self._ref_graph = {}
+        # $ref -> its encoded target, for every target a slice can need (none under #/paths).
+        self._targets = {}
+        pending = set()
+        _collect_refs(paths, pending)
+        while pending:
+            ref = pending.pop()
+            parts = _pointer_parts(ref)
+            target = _resolve(spec, parts)
+            direct = set()
+            _collect_refs(target, direct)
+            self._ref_graph[ref] = direct
+            if target is not None and parts and parts[0] != "paths":
+                self._targets[ref] = dumps(target)
+            pending |= direct - self._ref_graph.keys()
+        self._paths = {path: dumps(item) for path, item in paths.items()}
+
+        self._tags = {}
+        self._path_slices = {}
+        self.size = (
+            len(self.outline) + len(self._base) + len(self._security)
+            + sum(map(len, self._tag_docs.values()))
+            + sum(map(len, self._paths.values()))
+            + sum(map(len, self._targets.values()))
+            + sum(len(ref) + sum(map(len, direct)) for ref, direct in self._ref_graph.items())
+        )
+
+    def tag_slice(self, tag):
+        """(encoded slice, bytes added to the index) for tag; (None, 0) if the tag does not exist."""
+        if tag not in self._tag_paths:
+            return None, 0
+        return self._memoized(self._tags, tag, lambda: self._slice(self._tag_paths[tag], tag))
+
+    def path_slice(self, path):
+        """(encoded slice, bytes added to the index) for path; (None, 0) if the path does not exist."""
+        if path not in self._paths:
+            return None, 0
+        return self._memoized(self._path_slices, path, lambda: self._slice({path: None}))
+
+    def _memoized(self, slices: dict, key, build):
+        sliced = slices.get(key)
+        if sliced is not None:
+            return sliced, 0
+        with self._lock:
+            sliced = slices.get(key)
+            if sliced is not None:
+                return sliced, 0
+            sliced = slices[key] = dumps(build())
+            self.size += len(sliced)
+            return sliced, len(sliced)
+
+    def _ordered_tags(self, tag_paths):
+        declared = [name for name in self._tag_docs if name in tag_paths]
+        return declared + sorted(tag for tag in tag_paths if tag not in self._tag_docs)
+
+    def _closure(self, refs: set) -> set:
+        closure = set()
+        pending = list(refs)
+        while pending:
+            current = pending.pop()
+            if current in closure:
+                continue
+            closure.add(current)
+            pending.extend(self._ref_graph.get(current, ()))
+        return closure
+
+    def _slice(self, methods_by_path, tag=None) -> dict:
+        sliced_paths = {}
+        for path, methods in methods_by_path.items():
+            item = loads(self._paths[path])
+            if methods is None:
+                sliced_paths[path] = item
+            else:
+                sliced_paths[path] = {
+                    key: value for key, value in item.items()
+                    if key not in HTTP_METHODS or key in methods
+                }
+
+        refs = set()
+        _collect_refs(sliced_paths, refs)
+        needed = self._closure(refs)
+
+        doc = loads(self._base)
+        if tag is not None and tag in self._tag_docs:
+            doc["tags"] = [loads(self._tag_docs[tag])]
+        doc["paths"] = sliced_paths
+        doc.update(loads(self._security))
+        for ref in sorted(needed):
+            encoded = self._targets.get(ref)
+            if encoded is None:
+                continue
+            target = loads(encoded)
+            parts = _pointer_parts(ref)
+            node = doc
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+                if not isinstance(node, dict):
+                    break
+            else:
+                node[parts[-1]] = target
+        return doc
@@ -0,0 +1,237 @@
+import asyncio
+import gzip
+import hashlib
+import uuid
+from datetime import datetime
+
+from sqlalchemy import exists, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from database.database import SessionLocal, FDSpecBlob, FDSpecSnapshot, IST
+from utils.json_codec import loads
+from utils.spec_slicer import HTTP_METHODS
+from utils.sql_metrics import detach_request
+
+
+# Last stored content hash per (project_uuid, env), so unchanged refreshes skip the DB.
+_last_saved = {}
+_pending = set()
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def save_snapshot(project_uuid: str, env: str, raw: bytes):
+    """Record a snapshot of raw, storing its compressed content only if this hash is new."""
+    digest = content_hash(raw)
+    key = (project_uuid, env)
+    if _last_saved.get(key) == digest:
+        return
+
+    db = SessionLocal()
+    try:
+        latest = (
+            db.query(FDSpecSnapshot.content_hash)
+            .filter(FDSpecSnapshot.project_uuid == project_uuid, FDSpecSnapshot.env == env)
+            .order_by(FDSpecSnapshot.fetched_at.desc())
+            .first()
+        )
+        if latest is None or latest.content_hash != digest:
+            # The blob row stays locked until the snapshot row that uses it commits,
+            # so prune_orphan_blobs cannot delete it in between.
+            if _lock_blob(db, digest) is None:
+                try:
+                    with db.begin_nested():
+                        db.add(FDSpecBlob(
+                            content_hash=digest,
+                            content=gzip.compress(raw),
+                            size=len(raw),
+                            created_at=datetime.now(IST),
+                        ))
+                except IntegrityError:
+                    # Another worker stored the same content first.
+                    _lock_blob(db, digest)
+            db.add(FDSpecSnapshot(
+                snapshot_uuid=str(uuid.uuid4()),
+                project_uuid=project_uuid,
+                env=env,
+                content_hash=digest,
+                fetched_at=datetime.now(IST),
+            ))
+            db.commit()
+        _last_saved[key] = digest
+    finally:
+        db.close()
+
+
+def _lock_blob(db, digest: str):
+    return db.query(FDSpecBlob.content_hash).filter(FDSpecBlob.content_hash == digest).with_for_update().first()
+
+
+def schedule_snapshot(project_uuid: str, env: str, raw: bytes):
+    async def run():
+        detach_request()
+        try:
+            await asyncio.to_thread(save_snapshot, project_uuid, env, raw)
+        except Exception as e:
+            print(f"Failed to store spec snapshot for {project_uuid}/{env}: {e}")
+
+    task = asyncio.create_task(run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def forget_project(project_uuid: str, envs=None):
+    for key in [k for k in _last_saved if k[0] == project_uuid]:
+        if envs is None or key[1] in envs:
+            del _last_saved[key]
+
+
+def delete_snapshots(db, project_uuid: str, envs=None) -> set:
+    """Drop the project's snapshots (only for envs, if given) in db's transaction.
+
+    Snapshots are only meaningful for the URL they were fetched from, so an
+    env whose URL changes loses its history rather than falling back to
+    another URL's spec. Returns the content hashes the deleted snapshots
+    used, for prune_orphan_blobs once the transaction commits.
+    """
+    query = db.query(FDSpecSnapshot).filter(FDSpecSnapshot.project_uuid == project_uuid)
+    if envs is not None:
+        query = query.filter(FDSpecSnapshot.env.in_(list(envs)))
+    hashes = {digest for (digest,) in query.with_entities(FDSpecSnapshot.content_hash).distinct()}
+    if hashes:
+        query.delete(synchronize_session=False)
+    return hashes
+
+
+def delete_env_snapshots(db, invalidated) -> set:
+    """delete_snapshots for many projects at once: invalidated is [(project_uuid, envs)].
+
+    One SELECT and one DELETE for the whole list; returns the content hashes
+    the deleted snapshots used.
+    """
+    pairs = [(project_uuid, env) for project_uuid, envs in invalidated for env in envs]
+    if not pairs:
+        return set()
+    query = db.query(FDSpecSnapshot).filter(tuple_(FDSpecSnapshot.project_uuid, FDSpecSnapshot.env).in_(pairs))
+    hashes = {digest for (digest,) in query.with_entities(FDSpecSnapshot.content_hash).distinct()}
+    if hashes:
+        query.delete(synchronize_session=False)
+    return hashes
+
+
+def prune_orphan_blobs(hashes) -> int:
+    """Delete the stored contents among hashes that no snapshot references any more.
+
+    Each blob is checked under its row lock, the same lock save_snapshot
+    holds until its snapshot row commits.
+    """
+    db = SessionLocal()
+    try:
+        removed = 0
+        for digest in hashes:
+            if _lock_blob(db, digest) is not None and not db.query(
+                exists().where(FDSpecSnapshot.content_hash == digest)
+            ).scalar():
+                removed += db.query(FDSpecBlob).filter(FDSpecBlob.content_hash == digest).delete(synchronize_session=False)
+            db.commit()
+        return removed
+    finally:
+        db.close()
+
+
+def schedule_blob_prune(hashes):
+    if not hashes:
+        return
+
+    async def run():
+        detach_request()
+        try:
+            await asyncio.to_thread(prune_orphan_blobs, hashes)
+        except Exception as e:
+            print(f"Failed to prune spec snapshot blobs: {e}")
+
+    task = asyncio.create_task(run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def list_snapshots(db, project_uuid: str, env: str, limit: int):
+    rows = (
+        db.query(FDSpecSnapshot, FDSpecBlob.size)
+        .join(FDSpecBlob, FDSpecBlob.content_hash == FDSpecSnapshot.content_hash)
+        .filter(FDSpecSnapshot.project_uuid == project_uuid, FDSpecSnapshot.env == env)
+        .order_by(FDSpecSnapshot.fetched_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "snapshot_uuid": snapshot.snapshot_uuid,
+            "content_hash": snapshot.content_hash,
+            "size": size,
+            "fetched_at": snapshot.fetched_at,
+        } for snapshot, size in rows
+    ]
+
+
+def load_snapshot(db, project_uuid: str, env: str, snapshot_uuid: str = None):
+    """Return (snapshot, raw bytes) for snapshot_uuid, or for the latest snapshot if None."""
+    query = (
+        db.query(FDSpecSnapshot, FDSpecBlob.content)
+        .join(FDSpecBlob, FDSpecBlob.content_hash == FDSpecSnapshot.content_hash)
+        .filter(FDSpecSnapshot.project_uuid == project_uuid, FDSpecSnapshot.env == env)
+    )
+    if snapshot_uuid:
+        row = query.filter(FDSpecSnapshot.snapshot_uuid == snapshot_uuid).first()
+    else:
+        row = query.order_by(FDSpecSnapshot.fetched_at.desc()).first()
+    if row is None:
+        return None, None
+    snapshot, content = row
+    return snapshot, gzip.decompress(content)
+
+
+def load_latest_raw(project_uuid: str, env: str):
+    db = SessionLocal()
+    try:
+        _, raw = load_snapshot(db, project_uuid, env)
+        return raw
+    finally:
+        db.close()
+
+
+def _operations(spec: dict) -> dict:
+    operations = {}
+    for path, item in (spec.get("paths") or {}).items():
+        if isinstance(item, dict):
+            for method in HTTP_METHODS:
+                if method in item:
+                    operations[f"{method.upper()} {path}"] = item[method]
+    return operations
+
+
+def _schemas(spec: dict) -> dict:
+    return (spec.get("components") or {}).get("schemas") or spec.get("definitions") or {}
+
+
+def _diff_maps(old: dict, new: dict) -> dict:
+    return {
+        "added": sorted(k for k in new if k not in old),
+        "removed": sorted(k for k in old if k not in new),
+        "changed": sorted(k for k in new if k in old and new[k] != old[k]),
+    }
+
+
+def diff_specs(old_raw: bytes, new_raw: bytes) -> dict:
+    """Summarize what changed between two spec versions at operation and schema level."""
+    old, new = loads(old_raw), loads(new_raw)
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return {"identical": old == new}
+    return {
+        "identical": old == new,
+        "info": {"from": old.get("info", {}).get("version"), "to": new.get("info", {}).get("version")},
+        "operations": _diff_maps(_operations(old), _operations(new)),
+        "schemas": _diff_maps(_schemas(old), _schemas(new)),
+    }
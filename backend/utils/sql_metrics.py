@@ -0,0 +1,175 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# A statement run this many times in one request is reported as a likely N+1.
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))
+SQL_METRICS_MAX_STATEMENTS = int(os.getenv("SQL_METRICS_MAX_STATEMENTS", "200"))
+SQL_METRICS_RECENT = int(os.getenv("SQL_METRICS_RECENT", "50"))
+
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?|%\(\w+\)s)\s*,)+\s*(?:%s|\?|%\(\w+\)s)\s*\)")
+_TUPLE_LIST = re.compile(r"\((?:\s*\(\?, \.\.\.\)\s*,)+\s*\(\?, \.\.\.\)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestStats:
+    """Queries run for one request, or one unit of background work such as an upload batch."""
+
+    __slots__ = ("queries", "db_time", "statements", "name", "scope")
+
+    def __init__(self, name: str, scope: dict = None):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = {}
+        # The HTTP method with the request's ASGI scope, or a background job's name without one.
+        self.name = name
+        self.scope = scope
+
+    @property
+    def endpoint(self) -> str:
+        """The route template ("GET /projects/{uuid}"), so one endpoint aggregates under one key."""
+        if self.scope is None:
+            return self.name
+        # Routing fills in the matched route before any handler code runs.
+        route = self.scope.get("route")
+        return f"{self.name} {route.path}" if route is not None else f"{self.name} (unmatched)"
+
+
+_current = ContextVar("sql_request_stats", default=None)
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse whitespace and expanded IN lists so one query shape maps to one key."""
+    statement = _PLACEHOLDER_LIST.sub("(?, ...)", _WHITESPACE.sub(" ", statement).strip())
+    return _TUPLE_LIST.sub("((?, ...), ...)", statement)
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Types (never values) of the bound parameters, e.g. "500 x {team_id: str}"."""
+    def shape(params):
+        if isinstance(params, dict):
+            return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+        if isinstance(params, (list, tuple)):
+            return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+        return type(params).__name__
+
+    if executemany and isinstance(parameters, (list, tuple)):
+        return f"{len(parameters)} x {shape(parameters[0]) if parameters else '()'}"
+    return shape(parameters)
+
+
+class SQLMetrics:
+    """Process-wide aggregates: per endpoint, per statement shape, recent slow queries and N+1 reports."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.statements = {}
+        self.slow_queries = deque(maxlen=SQL_METRICS_RECENT)
+        self.repeated = deque(maxlen=SQL_METRICS_RECENT)
+
+    def record_query(self, statement: str, elapsed: float):
+        with self._lock:
+            stats = self.statements.get(statement)
+            if stats is None:
+                if len(self.statements) >= SQL_METRICS_MAX_STATEMENTS:
+                    # Make room by dropping the statement with the least total time.
+                    del self.statements[min(self.statements, key=lambda s: self.statements[s]["total_ms"])]
+                stats = self.statements[statement] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            ms = elapsed * 1000
+            stats["count"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def record_slow(self, statement: str, elapsed: float, shape: str, endpoint: str):
+        entry = {"statement": statement, "ms": round(elapsed * 1000, 1), "parameters": shape, "endpoint": endpoint, "at": time.time()}
+        with self._lock:
+            self.slow_queries.append(entry)
+        print(f"Slow query ({entry['ms']} ms) on {endpoint or 'background'}: {statement} params={shape}")
+
+    def record_request(self, endpoint: str, stats: RequestStats):
+        with self._lock:
+            totals = self.endpoints.setdefault(endpoint, {"requests": 0, "queries": 0, "db_ms": 0.0, "max_queries": 0})
+            totals["requests"] += 1
+            totals["queries"] += stats.queries
+            totals["db_ms"] += stats.db_time * 1000
+            totals["max_queries"] = max(totals["max_queries"], stats.queries)
+            for statement, count in stats.statements.items():
+                if count >= SQL_REPEAT_THRESHOLD:
+                    self.repeated.append({"endpoint": endpoint, "statement": statement, "count": count, "at": time.time()})
+                    print(f"Repeated statement on {endpoint}: {count} x {statement}")
+
+    def snapshot(self, top: int = 20) -> dict:
+        with self._lock:
+            endpoints = {
+                name: {**totals, "db_ms": round(totals["db_ms"], 1),
+                       "avg_queries": round(totals["queries"] / totals["requests"], 2)}
+                for name, totals in self.endpoints.items()
+            }
+            statements = sorted(
+                ({"statement": s, **v, "total_ms": round(v["total_ms"], 1), "max_ms": round(v["max_ms"], 1)}
+                 for s, v in self.statements.items()),
+                key=lambda s: s["total_ms"], reverse=True,
+            )[:top]
+            return {
+                "thresholds": {"slow_query_ms": SQL_SLOW_QUERY_MS, "repeat_threshold": SQL_REPEAT_THRESHOLD},
+                "endpoints": endpoints,
+                "top_statements": statements,
+                "slow_queries": list(self.slow_queries),
+                "repeated_statements": list(self.repeated),
+            }
+
+
+sql_metrics = SQLMetrics()
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        normalized = normalize_statement(statement)
+        sql_metrics.record_query(normalized, elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.statements[normalized] = stats.statements.get(normalized, 0) + 1
+        if elapsed * 1000 >= SQL_SLOW_QUERY_MS:
+            endpoint = stats.endpoint if stats is not None else None
+            sql_metrics.record_slow(normalized, elapsed, parameter_shape(parameters, executemany), endpoint)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def detach_request():
+    """Stop attributing queries to the request that spawned the current background task."""
+    _current.set(None)
+
+
+def begin_request(method: str, scope: dict) -> RequestStats:
+    """Start collecting for the current request; threadpool work inherits the context."""
+    stats = RequestStats(method, scope)
+    _current.set(stats)
+    return stats
+
+
+def begin_job(name: str) -> RequestStats:
+    """Start collecting for a unit of background work; report it with sql_metrics.record_request."""
+    stats = RequestStats(name)
+    _current.set(stats)
+    return stats
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+from collections import namedtuple
+
+from database.database import SessionLocal, FDTeam
+from utils.periodic import PeriodicTask
+
+
+# Other workers' new teams become visible after this many seconds; 0 disables the refresh.
+TEAM_DIRECTORY_REFRESH_INTERVAL = float(os.getenv("TEAM_DIRECTORY_REFRESH_INTERVAL", "300"))
+
+Team = namedtuple("Team", ["team_id", "team_name"])
+
+
+class TeamDirectory:
+    """In-process map of team names (case-insensitive) and ids.
+
+    Lookups that miss fall back to the database once and remember the
+    result, so a team created by another worker resolves immediately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._by_id = {}
+        self.loaded = False
+
+    def load(self):
+        db = SessionLocal()
+        try:
+            teams = [Team(team_id, team_name) for team_id, team_name in db.query(FDTeam.team_id, FDTeam.team_name).all()]
+        finally:
+            db.close()
+        with self._lock:
+            self._by_name = {team.team_name.lower(): team for team in teams}
+            self._by_id = {team.team_id: team for team in teams}
+            self.loaded = True
+
+    def add(self, team_id: str, team_name: str):
+        team = Team(team_id, team_name)
+        with self._lock:
+            self._by_name[team_name.lower()] = team
+            self._by_id[team_id] = team
+        return team
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def lookup(self, team_name: str):
+        """Team for team_name from memory only; None if unknown or not loaded yet."""
+        return self._by_name.get(team_name.lower()) if team_name else None
+
+    def resolve(self, db, team_name: str):
+        """Team for team_name, or None if no such team exists."""
+        if not team_name:
+            return None
+        self._ensure_loaded()
+        team = self._by_name.get(team_name.lower())
+        if team is None:
+            row = db.query(FDTeam.team_id, FDTeam.team_name).filter(FDTeam.team_name == team_name).first()
+            if row is not None:
+                team = self.add(row.team_id, row.team_name)
+        return team
+
+    def by_id(self, db, team_id: str):
+        self._ensure_loaded()
+        team = self._by_id.get(team_id)
+        if team is None:
+            row = db.query(FDTeam.team_id, FDTeam.team_name).filter(FDTeam.team_id == team_id).first()
+            if row is not None:
+                team = self.add(row.team_id, row.team_name)
+        return team
+
+
+team_directory = TeamDirectory()
+
+
+async def _reload():
+    await asyncio.to_thread(team_directory.load)
+
+
+directory_refresher = PeriodicTask("Team directory refresh", TEAM_DIRECTORY_REFRESH_INTERVAL, _reload, delay_first=True)
+
+
+async def start_team_directory():
+    try:
+        await asyncio.to_thread(team_directory.load)
+    except Exception as e:
+        print(f"Team directory load failed, resolving lazily: {e}")
+    directory_refresher.start()
+
+
+async def stop_team_directory():
+    await directory_refresher.stop()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+import httpx
+
+from utils.http_client import get_http_client, host_limit
+from utils.circuit_breaker import guarded, CircuitOpenError
+
+
+URL_VALIDATION_TIMEOUT = float(os.getenv("URL_VALIDATION_TIMEOUT", "10"))
+URL_VALIDATION_MAX_BYTES = int(os.getenv("URL_VALIDATION_MAX_BYTES", "4096"))
+URL_VALIDATION_TTL = float(os.getenv("URL_VALIDATION_TTL", "600"))
+URL_VALIDATION_NEGATIVE_TTL = float(os.getenv("URL_VALIDATION_NEGATIVE_TTL", "60"))
+URL_VALIDATION_CACHE_SIZE = int(os.getenv("URL_VALIDATION_CACHE_SIZE", "10000"))
+
+VALID = "valid"
+UNREACHABLE = "unreachable"
+NOT_JSON = "not_json"
+
+
+def _looks_like_json(head: bytes) -> bool:
+    if head.startswith(b"\xef\xbb\xbf"):
+        head = head[3:]
+    head = head.lstrip()
+    return head[:1] in (b"{", b"[")
+
+
+class ValidationResult:
+    __slots__ = ("result", "status", "checked_at", "cacheable")
+
+    def __init__(self, result: str, status=None, cacheable: bool = True):
+        self.result = result
+        self.status = status
+        self.checked_at = time.monotonic()
+        # False when the URL was never contacted (open breaker); such answers are not remembered.
+        self.cacheable = cacheable
+
+    def is_fresh(self) -> bool:
+        ttl = URL_VALIDATION_TTL if self.result == VALID else URL_VALIDATION_NEGATIVE_TTL
+        return time.monotonic() - self.checked_at < ttl
+
+
+# Normalized URL -> ValidationResult, least recently used first.
+_results = OrderedDict()
+_inflight = {}
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for url: scheme and host lowercased, default port and fragment dropped."""
+    try:
+        parsed = httpx.URL(url.strip())
+    except (httpx.InvalidURL, TypeError):
+        return url.strip()
+    return str(parsed.copy_with(fragment=None))
+
+
+async def _probe(url: str) -> ValidationResult:
+    client = get_http_client()
+    try:
+        request = client.build_request("GET", url, timeout=URL_VALIDATION_TIMEOUT)
+        async with host_limit(url):
+            response = await guarded(url, lambda: client.send(request, stream=True, follow_redirects=True))
+        try:
+            if not response.is_success:
+                return ValidationResult(UNREACHABLE, response.status_code)
+            head = b""
+            async for chunk in response.aiter_bytes():
+                head += chunk
+                if head.strip() or len(head) >= URL_VALIDATION_MAX_BYTES:
+                    break
+            return ValidationResult(VALID if _looks_like_json(head) else NOT_JSON, response.status_code)
+        finally:
+            await response.aclose()
+    except CircuitOpenError:
+        return ValidationResult(UNREACHABLE, cacheable=False)
+    except (httpx.HTTPError, httpx.InvalidURL):
+        return ValidationResult(UNREACHABLE)
+
+
+async def check_spec_url(url: str) -> str:
+    """Check that url answers 2xx with a JSON document, reading only the first few KB.
+
+    Results are cached per normalized URL (failures for a shorter TTL) and
+    concurrent checks of the same URL share one request.
+    Returns VALID, UNREACHABLE or NOT_JSON.
+    """
+    key = normalize_url(url)
+    cached = _results.get(key)
+    if cached is not None and cached.is_fresh():
+        _results.move_to_end(key)
+        return cached.result
+
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.ensure_future(_probe(key))
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    checked = await asyncio.shield(task)
+    if not checked.cacheable:
+        return checked.result
+
+    _results[key] = checked
+    _results.move_to_end(key)
+    while len(_results) > URL_VALIDATION_CACHE_SIZE:
+        _results.popitem(last=False)
+    return checked.result
@@ -2,7 +2,7 @@ import React, { useState, useContext, useCallback } from "react";
 import { BASE_API } from "../utils/baseApi";
 import { AuthContext } from "../contexts/AuthContext";
 import Loader from "./Loader";
-import { uploadCsvFile } from "../utils/csvUploadService";
+import { uploadCsvFile, waitForUploadJob } from "../utils/csvUploadService";
 import { useNavigate } from "react-router-dom";
 
 const CsvUpload = ({ onClose }) => {
@@ -58,12 +58,26 @@ const CsvUpload = ({ onClose }) => {
     setUploading(true);
     try {
       // Directly upload the selected file without parsing on frontend
-      const result = await uploadCsvFile(selectedFile, token);
-      if (result.error) {
-        setError(result.error);
+      const job = await uploadCsvFile(selectedFile, token);
+      const result = await waitForUploadJob(job.job_id, token, (progress) =>
+        setMessage(`Processing... ${progress.processed} rows`)
+      );
+      if (result.status === "failed") {
+        setMessage("");
+        setError(result.detail || "Upload failed");
         return;
       }
-      setMessage(result.message || "File uploaded successfully!");
+      const summary = `${result.created} projects added, ${result.updated} updated`;
+      if (result.failed > 0) {
+        const details = result.errors
+          .slice(0, 5)
+          .map((e) => `Row ${e.row}: ${e.error}`)
+          .join("; ");
+        setMessage(summary);
+        setError(`${result.failed} rows skipped. ${details}`);
+        return;
+      }
+      setMessage(summary);
       setSelectedFile(null);
       onClose();
       navigate('/');
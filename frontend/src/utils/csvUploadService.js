@@ -17,3 +17,39 @@ export const uploadCsvFile = async (file,token) => {
   }
   return result;
 };
+
+export const getUploadJob = async (jobId, token) => {
+  const response = await fetch(`${BASE_API}/upload/jobs/${jobId}`, {
+    headers: {
+      "Authorization": `Bearer ${token}`
+    },
+  });
+  const result = await response.json();
+  if (!response.ok) {
+    throw new Error(result.detail || "Could not fetch upload status");
+  }
+  return result;
+};
+
+// A batch can take minutes and a job can wait in the queue, so progress alone says
+// little; the worker holding the job refreshes heartbeat_at while it is alive.
+// Gives up when neither the job nor its heartbeat has moved for stallTimeoutMs.
+export const waitForUploadJob = async (jobId, token, onProgress, intervalMs = 1000, stallTimeoutMs = 120000) => {
+  let lastState = null;
+  let lastChange = Date.now();
+  for (;;) {
+    const job = await getUploadJob(jobId, token);
+    if (onProgress) onProgress(job);
+    if (job.status === "completed" || job.status === "failed") {
+      return job;
+    }
+    const state = `${job.status}:${job.processed}:${job.heartbeat_at}`;
+    if (state !== lastState) {
+      lastState = state;
+      lastChange = Date.now();
+    } else if (Date.now() - lastChange > stallTimeoutMs) {
+      throw new Error("the upload stopped making progress, check the upload jobs list later");
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};